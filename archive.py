@@ -0,0 +1,107 @@
+"""Compressed, immutable archive segments for events rotated out of the hot store.
+
+A segment is one gzip file of JSON rows (one ``EventRecord`` row per line)
+covering a contiguous range of event ids. Its summary (id and time range,
+repositories, counts per event type) is kept in the store's
+``archive_segments`` table, so queries can rule a segment out without
+opening the file.
+"""
+import gzip
+import os
+from pathlib import Path
+from typing import Optional
+import codec
+from extractors import utc_timestamp
+
+SEGMENT_COMPRESSION_LEVEL=int(os.environ.get("EVENT_SEGMENT_COMPRESSION_LEVEL","6"))
+
+# Positions in an EventRecord row (see event_store.SELECT_SQL).
+ID,TIMESTAMP,EVENT_TYPE,REPOSITORY,SENDER=0,2,3,5,9
+
+
+class Segment:
+    """Summary index entry of one archive segment."""
+
+    __slots__=("id","path","first_id","last_id","first_timestamp","last_timestamp","events","bytes",
+               "repositories","event_types")
+
+    def __init__(self,id,path,first_id,last_id,first_timestamp,last_timestamp,events,bytes,repositories,event_types):
+        self.id=id
+        self.path=path
+        self.first_id=first_id
+        self.last_id=last_id
+        self.first_timestamp=first_timestamp
+        self.last_timestamp=last_timestamp
+        self.events=events
+        self.bytes=bytes
+        self.repositories:list[str]=repositories
+        self.event_types:dict[str,int]=event_types
+
+    def may_contain(self,repository:Optional[str]=None,event_type:Optional[str]=None,since:Optional[str]=None,
+                    until:Optional[str]=None,before_id:Optional[int]=None)->bool:
+        """False when the summary alone proves no event in the segment matches."""
+        if before_id is not None and self.first_id>=before_id:
+            return False
+        if repository is not None and repository not in self.repositories:
+            return False
+        if event_type is not None and event_type not in self.event_types:
+            return False
+        if since is not None and (self.last_timestamp is None or self.last_timestamp<since):
+            return False
+        if until is not None and (self.first_timestamp is None or self.first_timestamp>=until):
+            return False
+        return True
+
+    def to_dict(self)->dict:
+        return {name:getattr(self,name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"Segment({self.first_id}-{self.last_id}, {self.events} events, {self.bytes} bytes)"
+
+
+def matches(row:tuple,repository:Optional[str]=None,event_type:Optional[str]=None,sender:Optional[str]=None,
+            since:Optional[str]=None,until:Optional[str]=None,before_id:Optional[int]=None)->bool:
+    """Same filter as ``EventStore.query`` applies in SQL, for one archived row."""
+    if repository is not None and row[REPOSITORY]!=repository:
+        return False
+    if event_type is not None and row[EVENT_TYPE]!=event_type:
+        return False
+    if sender is not None and row[SENDER]!=sender:
+        return False
+    if since is not None or until is not None:
+        # Segments written before timestamps were stored in UTC hold local times.
+        timestamp=utc_timestamp(row[TIMESTAMP])
+        if since is not None and (timestamp is None or timestamp<since):
+            return False
+        if until is not None and (timestamp is None or timestamp>=until):
+            return False
+    if before_id is not None and row[ID]>=before_id:
+        return False
+    return True
+
+
+def write_segment(directory:Path,rows:list[tuple])->Segment:
+    """Write ``rows`` (oldest first) to a new segment file and return its summary, not yet indexed."""
+    directory=Path(directory)
+    directory.mkdir(parents=True,exist_ok=True)
+    first_id,last_id=rows[0][ID],rows[-1][ID]
+    path=directory/f"events-{first_id:012d}-{last_id:012d}.jsonl.gz"
+    data=gzip.compress(b"\n".join(codec.dumps(list(row)) for row in rows),compresslevel=SEGMENT_COMPRESSION_LEVEL)
+    # Written under a temporary name so a crash never leaves a truncated segment behind.
+    partial=path.with_name(path.name+".partial")
+    partial.write_bytes(data)
+    os.replace(partial,path)
+    timestamps=[row[TIMESTAMP] for row in rows if row[TIMESTAMP] is not None]
+    event_types:dict[str,int]={}
+    for row in rows:
+        event_types[row[EVENT_TYPE]]=event_types.get(row[EVENT_TYPE],0)+1
+    repositories=sorted({row[REPOSITORY] for row in rows if row[REPOSITORY] is not None})
+    return Segment(None,str(path),first_id,last_id,min(timestamps,default=None),max(timestamps,default=None),
+                   len(rows),len(data),repositories,event_types)
+
+
+def read_segment(path:str)->list[tuple]:
+    """Rows of one segment, oldest first."""
+    with open(path,"rb") as f:
+        data=gzip.decompress(f.read())
+    return [tuple(codec.loads(line)) for line in data.split(b"\n") if line]
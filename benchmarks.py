@@ -0,0 +1,487 @@
+"""Benchmarks for the GitHub event pipeline.
+
+Run ``python benchmarks.py [name ...]``; with no names every benchmark runs.
+``--save-baseline FILE`` records the results and ``--compare FILE`` fails
+when a ``*_ms`` metric got slower, or a ``*_per_sec`` metric dropped, by more
+than ``--tolerance`` against that baseline. Benchmarks whose modules cannot be
+imported here (e.g. without the agents SDK) report ``skipped``.
+"""
+import argparse
+import importlib
+import json
+import sys
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import codec
+from event_store import EventRecord, EventStore, LEGACY_EVENTS_FILE
+from extractors import EXTRACTORS, extract_event
+
+BENCHMARKS={}
+
+
+def benchmark(fn):
+    BENCHMARKS[fn.__name__.removeprefix("bench_")]=fn
+    return fn
+
+
+def timeit(fn,repeat:int=50)->float:
+    """Median wall time of ``fn()`` in milliseconds."""
+    fn()
+    samples=[]
+    for _ in range(repeat):
+        start=time.perf_counter()
+        fn()
+        samples.append(time.perf_counter()-start)
+    return statistics.median(samples)*1000
+
+
+def _optional_import(name:str):
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        return e
+
+
+def _db_size(path:Path)->int:
+    """Database plus WAL size; the -shm file is a shared-memory index, not data."""
+    wal=path.with_name(path.name+"-wal")
+    return path.stat().st_size+(wal.stat().st_size if wal.exists() else 0)
+
+
+def _scaled_legacy_file(legacy_file:Path,scale:int,directory:Path)->Path:
+    """Write ``scale`` copies of the legacy history so per-event costs dominate fixed overhead."""
+    with open(legacy_file) as f:
+        events=json.load(f)
+    scaled=directory/f"events_x{scale}.json"
+    with open(scaled,"w") as f:
+        json.dump(events*scale,f,indent=2)
+    return scaled
+
+
+# ---------------------------Storage--------------------------------------------
+
+@benchmark
+def bench_storage(legacy_file:Path=LEGACY_EVENTS_FILE,scales=(1,10))->dict:
+    """Legacy github_events.json vs the compact event store: bytes on disk and full-history read time."""
+    results={}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            source=legacy_file if scale==1 else _scaled_legacy_file(legacy_file,scale,Path(tmp))
+
+            def legacy_read():
+                with open(source) as f:
+                    return json.load(f)
+
+            store=EventStore(Path(tmp)/f"events_x{scale}.db",max_events=None,legacy_file=None)
+            store.migrate(source)
+            store._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            legacy_bytes=source.stat().st_size
+            compact_bytes=_db_size(store.path)
+            legacy_ms=timeit(legacy_read,repeat=max(5,50//scale))
+            compact_ms=timeit(store.query,repeat=max(5,50//scale))
+            store.close()
+            results.update({
+                f"x{scale}_events":len(legacy_read()),
+                f"x{scale}_legacy_bytes":legacy_bytes,
+                f"x{scale}_compact_bytes":compact_bytes,
+                f"x{scale}_size_ratio":legacy_bytes/compact_bytes,
+                f"x{scale}_legacy_read_ms":legacy_ms,
+                f"x{scale}_compact_read_ms":compact_ms,
+                f"x{scale}_read_speedup":legacy_ms/compact_ms,
+            })
+    return results
+
+
+# ---------------------------Extraction-----------------------------------------
+
+def sample_payloads(legacy_file:Path=LEGACY_EVENTS_FILE)->dict[str,dict]:
+    """Representative raw webhook payloads per event type, built around the bundled repository object."""
+    with open(legacy_file) as f:
+        repository=next(e["repository"] for e in json.load(f) if isinstance(e.get("repository"),dict))
+    sender={"login":repository["owner"]["login"],"id":repository["owner"]["id"],"type":"User"}
+    commits=[{"id":f"{i:040x}","message":f"Commit message {i}\n\nDetails for change {i}.","author":{"name":"dev"}}
+             for i in range(5)]
+    return {
+        "pull_request":{"action":"opened","number":7,"repository":repository,"sender":sender,
+                        "pull_request":{"number":7,"title":"Add feature","body":"Long description "*20,
+                                        "base":{"ref":"main"},"head":{"ref":"feature/x"}}},
+        "push":{"ref":"refs/heads/main","commits":commits,"head_commit":commits[-1],
+                "repository":repository,"sender":sender},
+        "issues":{"action":"opened","issue":{"number":3,"title":"Bug","body":"Steps to reproduce "*10},
+                  "repository":repository,"sender":sender},
+        "release":{"action":"published","release":{"tag_name":"v1.0","name":"v1.0","body":"Notes "*20},
+                   "repository":repository,"sender":sender},
+        "create":{"ref":"feature/x","ref_type":"branch","repository":repository,"sender":sender},
+        "delete":{"ref":"feature/x","ref_type":"branch","repository":repository,"sender":sender},
+        "ping":{"zen":"Keep it logically awesome.","hook_id":1,"repository":repository,"sender":sender},
+    }
+
+
+@benchmark
+def bench_extract(n:int=2000)->dict:
+    """Canonical-record extraction throughput per event type (events/second)."""
+    results={}
+    for event_type,payload in sample_payloads().items():
+        label=event_type if event_type in EXTRACTORS else f"{event_type}(fallback)"
+
+        def run():
+            for _ in range(n):
+                extract_event(event_type,payload,event_id="bench",timestamp="2025-01-01T00:00:00+05:30")
+
+        results[f"{label}_per_sec"]=n/(timeit(run,repeat=5)/1000)
+    return results
+
+
+# ---------------------------Serialization--------------------------------------
+
+def _codecs()->dict:
+    """Every codec importable here, keyed by name, as (dumps, loads) pairs."""
+    codecs={"json":(codec._stdlib_dumps,codec._stdlib_loads)}
+    try:
+        import orjson
+        codecs["orjson"]=(orjson.dumps,orjson.loads)
+    except ImportError:
+        pass
+    try:
+        import msgspec
+        codecs["msgspec"]=(msgspec.json.encode,msgspec.json.decode)
+    except ImportError:
+        pass
+    return codecs
+
+
+@benchmark
+def bench_codec(legacy_file:Path=LEGACY_EVENTS_FILE)->dict:
+    """Ingest (decode payload, extract, encode for forwarding) and tool-read throughput per codec, on the bundled events."""
+    raw=legacy_file.read_bytes()
+    events=[e for e in json.loads(raw) if isinstance(e.get("repository"),dict)]
+    # Stored records keep the full repository object, so they are close to real webhook payloads in size.
+    payloads=[json.dumps({**e,"sender":{"login":e["sender"]}}).encode() for e in events]
+    results={"active_codec":codec.NAME,
+             "history_indent2_bytes":len(json.dumps(events,indent=2).encode()),
+             "history_compact_bytes":len(codec.dumps(events))}
+    with tempfile.TemporaryDirectory() as tmp:
+        store=EventStore(Path(tmp)/"events.db",max_events=None,legacy_file=None)
+        store.migrate(legacy_file)
+        for name,(dumps,loads) in _codecs().items():
+            def ingest():
+                for payload in payloads:
+                    event=loads(payload)
+                    dumps(extract_event(event["event_type"],event,event_id="bench",timestamp=event["timestamp"]))
+
+            def tool_read():
+                return dumps({"events":[record.to_dict() for record in store.query(limit=100)]})
+
+            results[f"{name}_ingest_per_sec"]=len(payloads)/(timeit(ingest,repeat=20)/1000)
+            results[f"{name}_tool_reads_per_sec"]=1/(timeit(tool_read,repeat=50)/1000)
+            results[f"{name}_history_decode_ms"]=timeit(lambda: loads(raw),repeat=20)
+        store.close()
+    return results
+
+
+# ---------------------------Hot paths------------------------------------------
+
+HISTORY_SIZES=(100,1_000,10_000,100_000)
+
+
+def _synthetic_history(n:int)->list[dict]:
+    """``n`` slim records spread over a few repositories, PRs and branches."""
+    kinds=[("push",None),("pull_request","opened"),("pull_request","closed"),("issues","opened"),("push",None)]
+    events=[]
+    for i in range(n):
+        event_type,action=kinds[i%len(kinds)]
+        repo=f"org/repo-{i%4}"
+        events.append({
+            "event_id":f"synthetic-{i}",
+            "timestamp":f"2025-08-{1+i%28:02d}T10:{i%60:02d}:00+05:30",
+            "event_type":event_type,
+            "action":action,
+            "repository":{"full_name":repo,"id":i%4,"default_branch":"main"},
+            "pr_number":(i//5)%50 if event_type=="pull_request" else None,
+            "title":f"{event_type} {i}",
+            "description":f"Commit message {i}\nSecond line",
+            "sender":f"user-{i%7}",
+            "base_branch":"main" if event_type=="pull_request" else None,
+            "compare_branch":f"feature-{i%3}",
+        })
+    return events
+
+
+@benchmark
+def bench_append(n:int=500)->dict:
+    """Per-event write cost: legacy read-modify-write of github_events.json vs EventStore.append."""
+    events=_synthetic_history(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_file=Path(tmp)/"events.json"
+        legacy_file.write_bytes(LEGACY_EVENTS_FILE.read_bytes())
+
+        def legacy_append(event):
+            with open(legacy_file) as f:
+                history=json.load(f)
+            history.append(event)
+            history=history[-100:]
+            with open(legacy_file,"w") as f:
+                json.dump(history,f,indent=2)
+
+        store=EventStore(Path(tmp)/"events.db",legacy_file=LEGACY_EVENTS_FILE)
+        store._connect()
+        results={}
+        for label,append in (("legacy_rmw",legacy_append),("store_append",store.append)):
+            start=time.perf_counter()
+            for event in events:
+                append({**event,"event_id":f"{label}-{event['event_id']}"})
+            results[f"{label}_ms"]=(time.perf_counter()-start)*1000/n
+        store.close()
+    return results
+
+
+@benchmark
+def bench_read_tools(sizes=HISTORY_SIZES)->dict:
+    """get_recent_events / get_repository_status cost as history grows (uncached loads)."""
+    github=_optional_import("github")
+    results={}
+    if isinstance(github,ImportError):
+        results["tool_models"]=f"skipped ({github}); timing store reads only"
+    get_store=None if isinstance(github,ImportError) else github.get_store
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            source=Path(tmp)/f"history_{n}.json"
+            source.write_bytes(codec.dumps(_synthetic_history(n)))
+            store=EventStore(Path(tmp)/f"history_{n}.db",max_events=None,legacy_file=None)
+            store.migrate(source)
+            if isinstance(github,ImportError):
+                recent=lambda: store.query(limit=10)
+                status=lambda: store.repository_stats()
+            else:
+                github.get_store=lambda: store
+                recent=github.recent_events_page
+                status=github._load_repository_status
+            results[f"recent_events_{n}_ms"]=timeit(recent,repeat=20)
+            results[f"repository_status_{n}_ms"]=timeit(status,repeat=20)
+            if n==sizes[-1] and not isinstance(github,ImportError):
+                # What the model reads: every stored field of the last 100 events vs one default page.
+                dump=codec.dumps_str([e.to_dict() for e in store.query(limit=100)])
+                results["full_dump_tokens"]=len(dump)//4
+                results["default_page_tokens"]=len(github.recent_events_page())//4
+            store.close()
+    if get_store is not None:
+        github.get_store=get_store
+    return results
+
+
+@benchmark
+def bench_retention(n:int=100_000,hot_events:int=1000,segment_events:int=1000)->dict:
+    """Archive size and historical query cost once ``n`` events have been rotated out of a small hot window."""
+    import archive
+    results={}
+    with tempfile.TemporaryDirectory() as tmp:
+        history=_synthetic_history(n)
+        # One repository that only shows up near the start, so only the oldest segment holds it.
+        history[10]={**history[10],"repository":{"full_name":"org/rare","id":99,"default_branch":"main"}}
+        source=Path(tmp)/"history.json"
+        source.write_bytes(codec.dumps(history))
+        store=EventStore(Path(tmp)/"events.db",max_events=hot_events,legacy_file=None,segment_events=segment_events,
+                         archive_max_bytes=0)
+        store.migrate(source)
+        results["hot_bytes_per_event"]=store.path.stat().st_size/n
+        start=time.perf_counter()
+        store.append({**history[-1],"event_id":"rotate"})
+        results["rotate_all_ms"]=(time.perf_counter()-start)*1000
+        stats=store.stats()
+        results["segments"]=stats["segments"]
+        results["archive_bytes_per_event"]=stats["archive_bytes"]/stats["archived_events"]
+
+        def uncached(query):
+            def run():
+                store._segment_rows.invalidate()
+                return query()
+            return run
+
+        results["rare_repository_ms"]=timeit(uncached(lambda: store.query(repository="org/rare",limit=10)),repeat=5)
+        results["open_every_segment_ms"]=timeit(lambda: [archive.read_segment(s.path) for s in store.segments()],
+                                                repeat=3)
+        results["archive_page_ms"]=timeit(uncached(lambda: store.query(limit=10,before_id=n//2)),repeat=20)
+        store.close()
+    return results
+
+
+CLASSIFIER_INPUTS=[
+    "what's the status of the repo?",
+    "show me the last 5 events",
+    "any open PRs on OPENAI_AGENT?",
+    "who pushed to main today",
+    "what is the price of bitcoin",
+    "recreate the summary for me",
+    "tell me a joke about cats",
+    "Summarize the latest GitHub event and post it to slack",
+]
+
+
+def _substring_classifier(query:str)->bool:
+    """The per-keyword substring scan main_agent used before router.py, kept as a reference point."""
+    github_keywords=["github","repository","repo","pull_request","event","pr","push","issue","create","delete"]
+    return any(word.lower() in query.lower() for word in github_keywords)
+
+
+@benchmark
+def bench_classify(n:int=20000)->dict:
+    """GitHub-intent classification over a mix of repository and unrelated questions (queries/second)."""
+    router=_optional_import("router")
+    if isinstance(router,ImportError):
+        return {"skipped":str(router)}
+    queries=CLASSIFIER_INPUTS*(n//len(CLASSIFIER_INPUTS))
+    results={}
+    for label,classify in (("substring",_substring_classifier),("router",router.is_github_related)):
+        results[f"{label}_per_sec"]=len(queries)/(timeit(lambda: [classify(q) for q in queries],repeat=5)/1000)
+    results["disagreements"]=sum(_substring_classifier(q)!=router.is_github_related(q) for q in CLASSIFIER_INPUTS)
+    return results
+
+
+@benchmark
+def bench_render(n:int=5000)->dict:
+    """Event summary rendering in handle_event and summarize_latest_event (renders/second)."""
+    event=extract_event("pull_request",sample_payloads()["pull_request"],event_id="bench",
+                        timestamp="2025-01-01T00:00:00+05:30")
+    results={}
+    main_agent=_optional_import("main_agent")
+    if isinstance(main_agent,ImportError):
+        results["handle_event"]=f"skipped ({main_agent})"
+    else:
+        results["handle_event_per_sec"]=n/(timeit(
+            lambda: [main_agent.render_event_summary("pull_request",event) for _ in range(n)],repeat=5)/1000)
+    github=_optional_import("github")
+    if isinstance(github,ImportError):
+        results["summarize_latest_event"]=f"skipped ({github})"
+    else:
+        latest=EventRecord(None,event["event_id"],event["timestamp"],event["event_type"],event["action"],
+                           event["repository"]["full_name"],event["pr_number"],event["title"],event["description"],
+                           event["sender"],event["base_branch"],event["compare_branch"],
+                           event["repository"]["default_branch"])
+        results["summarize_latest_event_per_sec"]=n/(timeit(
+            lambda: [github.format_event_summary(latest) for _ in range(n)],repeat=5)/1000)
+    return results
+
+
+@benchmark
+def bench_startup(repeat:int=3)->dict:
+    """Cold import time of each entry point, in a fresh interpreter."""
+    import subprocess
+    results={}
+    for module in ("webhook_server","main_agent","server","weave"):
+        if isinstance(_optional_import(module if module=="weave" else "agents"),ImportError):
+            results[f"import_{module}"]="skipped (not installed)"
+            continue
+        times=[]
+        for _ in range(repeat):
+            start=time.perf_counter()
+            subprocess.run([sys.executable,"-c",f"import {module}"],cwd=Path(__file__).parent,check=True,
+                           stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL)
+            times.append((time.perf_counter()-start)*1000)
+        results[f"import_{module}_ms"]=statistics.median(times)
+    return results
+
+
+@benchmark
+def bench_tracing(runs:int=200,export_latency:float=0.0002)->dict:
+    """Per-run cost of tracing a small agent run (1 agent, 1 guardrail, 3 tool spans) under each processor setup.
+
+    The exporter stand-in blocks ``export_latency`` seconds per callback, the
+    work a processor like Weave's does inline for every traced span.
+    """
+    tracing=_optional_import("tracing")
+    if isinstance(tracing,ImportError):
+        return {"skipped":str(tracing)}
+    from agents.tracing import agent_span, function_span, guardrail_span, set_trace_processors, trace
+
+    class BlockingExporter(tracing.TracingProcessor):
+        def _export(self,*args):
+            time.sleep(export_latency)
+        on_trace_start=on_trace_end=on_span_start=on_span_end=_export
+        def shutdown(self):
+            pass
+        def force_flush(self):
+            pass
+
+    def one_run():
+        with trace("bench"):
+            with agent_span(name="Main Agent"):
+                with guardrail_span(name="security_guardrail"):
+                    pass
+                for tool in ("get_recent_events","get_repository_status","summarize_latest_event"):
+                    with function_span(name=tool):
+                        pass
+
+    setups={
+        "disabled":lambda: [],
+        "metrics_only":lambda: [tracing.MetricsTracingProcessor()],
+        "export_all":lambda: [tracing.MetricsTracingProcessor(),BlockingExporter()],
+        "sampled_50pct":lambda: [tracing.MetricsTracingProcessor(),
+                                 tracing.SampledBatchProcessor(BlockingExporter(),sample_rate=0.5)],
+        "sampled_10pct":lambda: [tracing.MetricsTracingProcessor(),
+                                 tracing.SampledBatchProcessor(BlockingExporter(),sample_rate=0.1)],
+    }
+    results={}
+    for name,processors in setups.items():
+        installed=processors()
+        set_trace_processors(installed)
+        results[f"{name}_run_ms"]=timeit(lambda: [one_run() for _ in range(runs)],repeat=3)/runs
+        for processor in installed:
+            processor.shutdown()
+    set_trace_processors([])
+    return results
+
+
+# ---------------------------Baselines------------------------------------------
+
+def compare(results:dict,baseline:dict,tolerance:float)->list[str]:
+    """Human-readable regressions of ``results`` against ``baseline``."""
+    regressions=[]
+    for name,metrics in results.items():
+        for key,value in metrics.items():
+            before=baseline.get(name,{}).get(key)
+            if not isinstance(value,(int,float)) or not isinstance(before,(int,float)) or not before:
+                continue
+            if key.endswith("_ms") and value>before*(1+tolerance):
+                regressions.append(f"{name}.{key}: {before:,.3f} -> {value:,.3f} ms (+{value/before-1:.0%})")
+            elif key.endswith("_per_sec") and value<before*(1-tolerance):
+                regressions.append(f"{name}.{key}: {before:,.0f} -> {value:,.0f}/s ({value/before-1:.0%})")
+    return regressions
+
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("names",nargs="*",help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--json",action="store_true",help="print machine-readable results")
+    parser.add_argument("--save-baseline",type=Path,metavar="FILE",help="write results to FILE")
+    parser.add_argument("--compare",type=Path,metavar="FILE",help="fail on regressions against baseline FILE")
+    parser.add_argument("--tolerance",type=float,default=0.2,help="allowed relative slowdown (default 0.2)")
+    args=parser.parse_args()
+    unknown=set(args.names)-set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    results={name:BENCHMARKS[name]() for name in (args.names or BENCHMARKS)}
+    if args.json:
+        print(json.dumps(results,indent=2))
+    else:
+        for name,metrics in results.items():
+            print(f"== {name}")
+            for key,value in metrics.items():
+                if isinstance(value,float):
+                    print(f"  {key:<28} {value:,.3f}")
+                elif isinstance(value,int):
+                    print(f"  {key:<28} {value:,}")
+                else:
+                    print(f"  {key:<28} {value}")
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results,indent=2)+"\n")
+        print(f"✅ Baseline written to {args.save_baseline}")
+    if args.compare:
+        regressions=compare(results,json.loads(args.compare.read_text()),args.tolerance)
+        for regression in regressions:
+            print(f"❌ {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.compare}")
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import inspect
+import multiprocessing
+import os
+import queue
+import time
+from typing import Awaitable, Callable, Optional, Union
+import codec
+from extractors import repository_name
+
+WORKER_PUT_TIMEOUT=float(os.environ.get("WORKER_PUT_TIMEOUT","30"))
+
+Handler=Callable[[dict],Union[Awaitable,None]]
+
+
+def shard_for(repository:Optional[str],shards:int)->int:
+    """Stable shard index for a repository (unlike hash(), the same in every process).
+
+    blake2b rather than crc32: crc32 of names differing in one character,
+    like "org/repo-1" and "org/repo-3", shares its low bits.
+    """
+    digest=hashlib.blake2b((repository or "").encode(),digest_size=8).digest()
+    return int.from_bytes(digest,"big")%shards
+
+
+class WorkerBusy(Exception):
+    """A shard's queue stayed full; the event is stored but was not handed to its worker."""
+
+
+class EventBus:
+    """In-process hand-off from the webhook route to the agent pipeline.
+
+    Has the same start/submit/stop/stats surface as ManagerForwarder, so the
+    webhook handler can publish to it directly instead of POSTing to /notify.
+    Events are already stored and de-duplicated by the webhook handler.
+    """
+
+    def __init__(self):
+        self._subscribers:list[Handler]=[]
+        self.published=0
+        self.failed=0
+
+    def subscribe(self,handler:Handler):
+        self._subscribers.append(handler)
+
+    async def start(self):
+        pass
+
+    async def submit(self,event:dict):
+        self.published+=1
+        for handler in self._subscribers:
+            try:
+                result=handler(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.failed+=1
+                print(f"❌ Event bus subscriber failed for {event.get('event_type')}: {e}")
+
+    async def stop(self):
+        pass
+
+    def stats(self)->dict:
+        return {"subscribers":len(self._subscribers),"published":self.published,"failed":self.failed}
+
+
+class ShardedBus:
+    """Publishes events to worker processes, one queue per shard.
+
+    Every event for a repository lands on the same shard, and each shard is
+    drained by a single worker, so per-repository order is preserved. While
+    a shard's queue is full, ``on_stall(index)`` is called every
+    ``stall_interval`` seconds (to restart a dead worker); after
+    ``put_timeout`` seconds the submit raises WorkerBusy instead of waiting
+    forever.
+    """
+
+    def __init__(self,queues:list[multiprocessing.Queue],on_stall:Optional[Callable[[int],object]]=None,
+                 put_timeout:float=WORKER_PUT_TIMEOUT,stall_interval:float=1.0):
+        self.queues=queues
+        self.on_stall=on_stall
+        self.put_timeout=put_timeout
+        self.stall_interval=stall_interval
+        self.published=[0]*len(queues)
+        self.blocked=0
+        self.timed_out=0
+
+    async def start(self):
+        pass
+
+    async def submit(self,event:dict):
+        index=shard_for(repository_name(event),len(self.queues))
+        payload=codec.dumps(event)
+        try:
+            self.queues[index].put_nowait(payload)
+        except queue.Full:
+            # The worker is behind or gone; wait for room off the event loop, a bounded time.
+            self.blocked+=1
+            deadline=time.monotonic()+self.put_timeout
+            while True:
+                if self.on_stall is not None:
+                    self.on_stall(index)
+                try:
+                    # Re-read the queue each time: a restarted worker comes with a new one.
+                    await asyncio.to_thread(self.queues[index].put,payload,True,self.stall_interval)
+                    break
+                except queue.Full:
+                    if time.monotonic()>=deadline:
+                        self.timed_out+=1
+                        raise WorkerBusy(f"worker {index} queue stayed full for {self.put_timeout}s")
+        self.published[index]+=1
+
+    async def stop(self,timeout:float=5.0):
+        """Tell every worker to finish its queue and exit."""
+        for q in self.queues:
+            try:
+                await asyncio.to_thread(q.put,None,True,timeout)
+            except queue.Full:
+                print("⚠️ Worker queue still full at shutdown, its remaining events stay in the store only")
+                q.cancel_join_thread()
+
+    def stats(self)->dict:
+        return {
+            "published":sum(self.published),
+            "blocked":self.blocked,
+            "timed_out":self.timed_out,
+            "shard_published":{str(i):n for i,n in enumerate(self.published)},
+            "queue_depth":sum(q.qsize() for q in self.queues),
+        }
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class VersionedCache:
+    """Memoizes values derived from the event store until the store version changes.
+
+    Callers pass the current ``EventStore.version()``; since that counter is
+    read from the database, appends made by the webhook server process
+    invalidate entries here too. Keys can come from model tool arguments, so
+    entries are kept in a size-bounded, expiring ``TTLCache``.
+    """
+
+    def __init__(self,maxsize:int=1024,ttl:float=3600.0):
+        self._entries=TTLCache(maxsize=maxsize,ttl=ttl)
+        self.hits=0
+        self.misses=0
+
+    def get(self,key:Hashable,version:int,loader:Callable[[],Any])->Any:
+        entry=self._entries.get(key)
+        if entry is not None and entry[0]==version:
+            self.hits+=1
+            return entry[1]
+        self.misses+=1
+        value=loader()
+        self._entries.set(key,(version,value))
+        return value
+
+    def invalidate(self,key:Optional[Hashable]=None):
+        self._entries.invalidate(key)
+
+    def stats(self)->dict:
+        lookups=self.hits+self.misses
+        return {
+            "hits":self.hits,
+            "misses":self.misses,
+            "hit_rate":self.hits/lookups if lookups else 0.0,
+            "evictions":self._entries.evictions,
+            "entries":len(self._entries),
+        }
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire ``ttl`` seconds after they are set.
+
+    Safe to share between threads (the store's caches are used from tool calls
+    running in ``asyncio.to_thread``).
+    """
+
+    def __init__(self,maxsize:int=1024,ttl:float=300.0,clock:Callable[[],float]=time.monotonic):
+        self.maxsize=maxsize
+        self.ttl=ttl
+        self._clock=clock
+        self._entries:OrderedDict[Hashable,tuple[float,Any]]=OrderedDict()
+        self._lock=threading.Lock()
+        self.hits=0
+        self.misses=0
+        self.evictions=0
+
+    def get(self,key:Hashable,default:Any=None)->Any:
+        with self._lock:
+            entry=self._entries.get(key)
+            if entry is None or entry[0]<=self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses+=1
+                return default
+            self._entries.move_to_end(key)
+            self.hits+=1
+            return entry[1]
+
+    def set(self,key:Hashable,value:Any):
+        with self._lock:
+            self._entries[key]=(self._clock()+self.ttl,value)
+            self._entries.move_to_end(key)
+            while len(self._entries)>self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions+=1
+
+    def invalidate(self,key:Optional[Hashable]=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key,None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self)->dict:
+        lookups=self.hits+self.misses
+        return {
+            "hits":self.hits,
+            "misses":self.misses,
+            "hit_rate":self.hits/lookups if lookups else 0.0,
+            "evictions":self.evictions,
+            "entries":len(self._entries),
+        }
@@ -0,0 +1,47 @@
+"""JSON codec used on the ingest, forwarding and storage paths.
+
+Uses orjson or msgspec when installed and falls back to the stdlib ``json``
+module. Output is always compact (no indentation). Set EVENT_CODEC=json to
+force the stdlib implementation.
+"""
+import json
+import os
+
+CODEC=os.environ.get("EVENT_CODEC","auto").lower()
+
+_json_encoder=json.JSONEncoder(separators=(",",":"),ensure_ascii=False)
+
+
+def _stdlib_dumps(obj)->bytes:
+    return _json_encoder.encode(obj).encode()
+
+
+def _stdlib_loads(data:bytes|str):
+    return json.loads(data)
+
+
+NAME="json"
+dumps=_stdlib_dumps
+loads=_stdlib_loads
+
+if CODEC in ("auto","orjson"):
+    try:
+        import orjson
+        NAME="orjson"
+        dumps=orjson.dumps
+        loads=orjson.loads
+    except ImportError:
+        pass
+
+if NAME=="json" and CODEC in ("auto","msgspec"):
+    try:
+        import msgspec
+        NAME="msgspec"
+        dumps=msgspec.json.encode
+        loads=msgspec.json.decode
+    except ImportError:
+        pass
+
+
+def dumps_str(obj)->str:
+    return dumps(obj).decode()
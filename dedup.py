@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+DEDUP_FILE=Path(__file__).parent / "seen_deliveries.db"
+DEDUP_TTL=float(os.environ.get("DEDUP_TTL",str(3*24*3600)))
+DEDUP_MAX_ENTRIES=int(os.environ.get("DEDUP_MAX_ENTRIES","50000"))
+
+
+def content_key(event_type:str,body:bytes)->str:
+    """Fallback idempotency key for deliveries without an X-GitHub-Delivery header."""
+    return "sha256:"+hashlib.sha256(event_type.encode()+b"\0"+body).hexdigest()
+
+
+class Deduplicator:
+    """Bounded, time-expiring seen-set of delivery keys that survives restarts.
+
+    Lookups are answered from memory; new keys are also written to a small
+    SQLite table (one namespace per consumer) that is reloaded on first use,
+    so merely importing a module that owns a Deduplicator touches no files.
+    """
+
+    def __init__(self,namespace:str,path:Path=DEDUP_FILE,ttl:float=DEDUP_TTL,max_entries:int=DEDUP_MAX_ENTRIES,
+                 clock:Callable[[],float]=time.time,prune_every:int=1000):
+        self.namespace=namespace
+        self.path=path
+        self.ttl=ttl
+        self.max_entries=max_entries
+        self._clock=clock
+        self.prune_every=prune_every
+        self._seen:OrderedDict[str,float]=OrderedDict()
+        self._lock=threading.Lock()
+        self._inserts=0
+        self.checks=0
+        self.duplicates=0
+        self.conn:Optional[sqlite3.Connection]=None
+
+    def _open(self):
+        with self._lock:
+            if self.conn is not None:
+                return
+            conn=sqlite3.connect(self.path,timeout=30,isolation_level=None,check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS seen(namespace TEXT NOT NULL, key TEXT NOT NULL, "
+                         "seen_at REAL NOT NULL, PRIMARY KEY(namespace, key))")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_at ON seen(namespace, seen_at)")
+            self.conn=conn
+            self._load()
+
+    def _load(self):
+        cutoff=self._clock()-self.ttl
+        rows=self.conn.execute(
+            "SELECT key, seen_at FROM seen WHERE namespace=? AND seen_at>? ORDER BY seen_at DESC LIMIT ?",
+            (self.namespace,cutoff,self.max_entries)).fetchall()
+        for key,seen_at in reversed(rows):
+            self._seen[key]=seen_at
+
+    def _expire(self,now:float):
+        cutoff=now-self.ttl
+        while self._seen:
+            key,seen_at=next(iter(self._seen.items()))
+            if seen_at>cutoff and len(self._seen)<=self.max_entries:
+                break
+            self._seen.popitem(last=False)
+
+    async def claim(self,key:str)->bool:
+        """Record ``key`` as seen. Returns False if it was already seen within the TTL."""
+        if self.conn is None:
+            await asyncio.to_thread(self._open)
+        now=self._clock()
+        self.checks+=1
+        self._expire(now)
+        if key in self._seen:
+            self.duplicates+=1
+            return False
+        self._seen[key]=now
+        if len(self._seen)>self.max_entries:
+            self._seen.popitem(last=False)
+        await asyncio.to_thread(self._persist,key,now)
+        return True
+
+    async def forget(self,key:str):
+        """Drop ``key`` so a delivery whose processing failed can be retried."""
+        self._seen.pop(key,None)
+        if self.conn is not None:
+            await asyncio.to_thread(self._delete,key)
+
+    def _persist(self,key:str,now:float):
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO seen(namespace,key,seen_at) VALUES(?,?,?)",(self.namespace,key,now))
+            self._inserts+=1
+            if self._inserts%self.prune_every==0:
+                self._prune(now)
+
+    def _delete(self,key:str):
+        with self._lock:
+            self.conn.execute("DELETE FROM seen WHERE namespace=? AND key=?",(self.namespace,key))
+
+    def _prune(self,now:float):
+        self.conn.execute("DELETE FROM seen WHERE namespace=? AND seen_at<=?",(self.namespace,now-self.ttl))
+        self.conn.execute(
+            "DELETE FROM seen WHERE namespace=? AND key IN (SELECT key FROM seen WHERE namespace=? "
+            "ORDER BY seen_at DESC LIMIT -1 OFFSET ?)",(self.namespace,self.namespace,self.max_entries))
+
+    def stats(self)->dict:
+        return {
+            "checks":self.checks,
+            "duplicates":self.duplicates,
+            "hit_rate":self.duplicates/self.checks if self.checks else 0.0,
+            "entries":len(self._seen),
+        }
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn=None
@@ -0,0 +1,126 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Hashable, Optional
+from extractors import repository_name
+
+DIGEST_WINDOW=float(os.environ.get("DIGEST_WINDOW","2"))
+DIGEST_MAX_BATCH=int(os.environ.get("DIGEST_MAX_BATCH","20"))
+DIGEST_GROUP_BY_PR=os.environ.get("DIGEST_GROUP_BY_PR","false").lower()=="true"
+DIGEST_FLUSH_ON_SHUTDOWN=os.environ.get("DIGEST_FLUSH_ON_SHUTDOWN","true").lower()=="true"
+
+
+def is_pr_state_change(event_type:str,data:dict)->bool:
+    return event_type=="pull_request" and data.get("action") in ("opened","closed","reopened")
+
+
+class _Batch:
+    __slots__=("events","timer")
+
+    def __init__(self):
+        self.events:list[tuple[str,dict]]=[]
+        self.timer:Optional[asyncio.Task]=None
+
+
+class EventCoalescer:
+    """Groups bursts of GitHub events into one Slack digest per repository.
+
+    Events for the same repository (and optionally the same PR) that arrive
+    within ``window`` seconds are sent as a single message; a batch is sent
+    early once it reaches ``max_batch`` events. Events for which
+    ``immediate`` returns True bypass the buffer. ``send`` receives the
+    message and the repository it is about.
+    """
+
+    def __init__(self,send:Callable[[str,Optional[str]],Awaitable],render_single:Callable[[str,dict],str],
+                 window:float=DIGEST_WINDOW,max_batch:int=DIGEST_MAX_BATCH,group_by_pr:bool=DIGEST_GROUP_BY_PR,
+                 immediate:Callable[[str,dict],bool]=is_pr_state_change,flush_on_shutdown:bool=DIGEST_FLUSH_ON_SHUTDOWN):
+        self.send=send
+        self.render_single=render_single
+        self.window=window
+        self.max_batch=max_batch
+        self.group_by_pr=group_by_pr
+        self.immediate=immediate
+        self.flush_on_shutdown=flush_on_shutdown
+        self._batches:dict[Hashable,_Batch]={}
+        self.events_received=0
+        self.messages_sent=0
+        self.digests_sent=0
+        self.failed_flushes=0
+
+    def _key(self,data:dict)->Hashable:
+        repository=repository_name(data)
+        return (repository,data.get("pr_number")) if self.group_by_pr else repository
+
+    async def add(self,event_type:str,data:dict):
+        self.events_received+=1
+        if self.window<=0 or self.immediate(event_type,data):
+            await self._send(self.render_single(event_type,data),repository_name(data))
+            return
+        key=self._key(data)
+        batch=self._batches.get(key)
+        if batch is None:
+            batch=self._batches[key]=_Batch()
+            batch.timer=asyncio.create_task(self._flush_later(key))
+        batch.events.append((event_type,data))
+        if len(batch.events)>=self.max_batch:
+            await self.flush(key)
+
+    async def _flush_later(self,key:Hashable):
+        await asyncio.sleep(self.window)
+        try:
+            await self.flush(key)
+        except Exception as e:
+            # Nothing awaits this task, so an error here would otherwise go unnoticed.
+            self.failed_flushes+=1
+            print(f"❌ Digest for {key} could not be sent: {e}")
+
+    async def flush(self,key:Hashable):
+        batch=self._batches.pop(key,None)
+        if batch is None:
+            return
+        if batch.timer is not None and batch.timer is not asyncio.current_task():
+            batch.timer.cancel()
+        repository=key[0] if self.group_by_pr else key
+        if len(batch.events)==1:
+            await self._send(self.render_single(*batch.events[0]),repository)
+        else:
+            self.digests_sent+=1
+            await self._send(self.render_digest(key,batch.events),repository)
+
+    async def flush_all(self):
+        for key in list(self._batches):
+            await self.flush(key)
+
+    async def close(self):
+        if self.flush_on_shutdown:
+            await self.flush_all()
+        for batch in self._batches.values():
+            if batch.timer is not None:
+                batch.timer.cancel()
+        self._batches.clear()
+
+    async def _send(self,message:str,repository:Optional[str]):
+        self.messages_sent+=1
+        await self.send(message,repository)
+
+    def render_digest(self,key:Hashable,events:list[tuple[str,dict]])->str:
+        repository,pr_number=key if self.group_by_pr else (key,None)
+        scope=f"{repository} PR #{pr_number}" if pr_number else repository
+        lines=[f"🗂️ {len(events)} GitHub events on repository: {scope}"]
+        for event_type,data in events:
+            line=f"- {event_type}({data.get('action')}) by {data.get('sender')}"
+            if data.get("title"):
+                line+=f": {data.get('title')}"
+            if data.get("compare_branch"):
+                line+=f" [{data.get('compare_branch')}]"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def stats(self)->dict:
+        return {
+            "events_received":self.events_received,
+            "messages_sent":self.messages_sent,
+            "digests_sent":self.digests_sent,
+            "failed_flushes":self.failed_flushes,
+            "pending_batches":len(self._batches),
+        }
@@ -0,0 +1,658 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+import archive
+import codec
+from archive import Segment
+from cache import TTLCache
+from extractors import utc_timestamp
+
+DB_FILE=Path(__file__).parent / "github_events.db"
+LEGACY_EVENTS_FILE=Path(__file__).parent / "github_events.json"
+# Newest events kept in the indexed table; older ones are rotated into compressed archive segments.
+MAX_EVENTS=int(os.environ.get("EVENT_HOT_MAX_EVENTS","10000"))
+# Events older than this many seconds are rotated as well (0 rotates by size only).
+HOT_MAX_AGE=float(os.environ.get("EVENT_HOT_MAX_AGE","0"))
+SEGMENT_EVENTS=int(os.environ.get("EVENT_SEGMENT_EVENTS","1000"))
+# Oldest segments are deleted once the archive is larger than this (0 keeps every segment).
+ARCHIVE_MAX_BYTES=int(os.environ.get("EVENT_ARCHIVE_MAX_BYTES",str(256*1024*1024)))
+AGE_CHECK_INTERVAL=60
+SEGMENT_CACHE_SIZE=4
+SCHEMA_VERSION=6
+# Page size of newly created stores. The store has about a dozen tables and indexes of
+# at least one page each, so 4 KB pages made a small store several times its data.
+PAGE_SIZE=2048
+
+# ---------------------------Schema---------------------------------------------
+
+SCHEMA="""
+CREATE TABLE IF NOT EXISTS repositories(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    full_name TEXT NOT NULL UNIQUE,
+    github_id INTEGER,
+    default_branch TEXT
+);
+CREATE TABLE IF NOT EXISTS events(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT NOT NULL UNIQUE,
+    timestamp TEXT,
+    event_type TEXT NOT NULL,
+    action TEXT,
+    repo_id INTEGER REFERENCES repositories(id),
+    pr_number INTEGER,
+    title TEXT,
+    description TEXT,
+    sender TEXT,
+    base_branch TEXT,
+    compare_branch TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_repo_id ON events(repo_id, id);
+CREATE INDEX IF NOT EXISTS idx_events_event_type ON events(event_type, id);
+CREATE INDEX IF NOT EXISTS idx_events_sender ON events(sender, id);
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp);
+CREATE TABLE IF NOT EXISTS repo_stats(
+    repo_id INTEGER PRIMARY KEY REFERENCES repositories(id),
+    events INTEGER NOT NULL DEFAULT 0,
+    pushes INTEGER NOT NULL DEFAULT 0,
+    issues INTEGER NOT NULL DEFAULT 0,
+    issues_opened INTEGER NOT NULL DEFAULT 0,
+    issues_closed INTEGER NOT NULL DEFAULT 0,
+    latest_seq INTEGER,
+    latest_event_type TEXT,
+    latest_action TEXT,
+    latest_timestamp TEXT
+);
+CREATE TABLE IF NOT EXISTS pull_requests(
+    repo_id INTEGER NOT NULL REFERENCES repositories(id),
+    pr_number INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    title TEXT,
+    updated_at TEXT,
+    PRIMARY KEY(repo_id, pr_number)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS branch_pushes(
+    repo_id INTEGER NOT NULL REFERENCES repositories(id),
+    branch TEXT NOT NULL,
+    pushes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY(repo_id, branch)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS archive_segments(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    first_id INTEGER NOT NULL,
+    last_id INTEGER NOT NULL,
+    first_timestamp TEXT,
+    last_timestamp TEXT,
+    events INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    repositories TEXT NOT NULL,
+    event_types TEXT NOT NULL
+);
+"""
+
+PR_STATES={"opened":"open","reopened":"open","closed":"closed"}
+
+COLUMNS=("event_id","timestamp","event_type","action","repo_id","pr_number",
+         "title","description","sender","base_branch","compare_branch")
+INSERT_SQL=f"INSERT OR IGNORE INTO events({','.join(COLUMNS)}) VALUES({','.join('?'*len(COLUMNS))})"
+SELECT_SQL="""SELECT e.id, e.event_id, e.timestamp, e.event_type, e.action, r.full_name, e.pr_number,
+       e.title, e.description, e.sender, e.base_branch, e.compare_branch, r.default_branch
+FROM events e LEFT JOIN repositories r ON r.id=e.repo_id"""
+
+
+def _create_schema(conn:sqlite3.Connection):
+    for statement in SCHEMA.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+
+
+def new_event_id()->str:
+    return uuid.uuid4().hex
+
+
+class EventRecord:
+    """Slim, read-only view of one stored event."""
+
+    __slots__=("id","event_id","timestamp","event_type","action","repository","pr_number",
+               "title","description","sender","base_branch","compare_branch","default_branch")
+
+    def __init__(self,id,event_id,timestamp,event_type,action,repository,pr_number,
+                 title,description,sender,base_branch,compare_branch,default_branch):
+        self.id=id
+        self.event_id=event_id
+        self.timestamp=timestamp
+        self.event_type=event_type
+        self.action=action
+        self.repository=repository
+        self.pr_number=pr_number
+        self.title=title
+        self.description=description
+        self.sender=sender
+        self.base_branch=base_branch
+        self.compare_branch=compare_branch
+        self.default_branch=default_branch
+
+    def to_dict(self)->dict:
+        return {name:getattr(self,name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"EventRecord({self.event_type}({self.action}) on {self.repository} at {self.timestamp})"
+
+
+class RepositoryStats:
+    """Materialized per-repository counters, maintained at ingest time."""
+
+    __slots__=("repository","default_branch","events","pushes","issues","issues_opened","issues_closed",
+               "latest_event_type","latest_action","latest_timestamp","open_prs","closed_prs","branch_pushes")
+
+    def __init__(self,repository,default_branch,events,pushes,issues,issues_opened,issues_closed,
+                 latest_event_type,latest_action,latest_timestamp,open_prs,closed_prs,branch_pushes):
+        self.repository=repository
+        self.default_branch=default_branch
+        self.events=events
+        self.pushes=pushes
+        self.issues=issues
+        self.issues_opened=issues_opened
+        self.issues_closed=issues_closed
+        self.latest_event_type=latest_event_type
+        self.latest_action=latest_action
+        self.latest_timestamp=latest_timestamp
+        self.open_prs:list[int]=open_prs
+        self.closed_prs:int=closed_prs
+        self.branch_pushes:dict[str,int]=branch_pushes
+
+    def to_dict(self)->dict:
+        return {name:getattr(self,name) for name in self.__slots__}
+
+
+# ---------------------------Store----------------------------------------------
+
+class EventStore:
+    """Append-only GitHub event log shared by the webhook server and the main agent.
+
+    Backed by SQLite in WAL mode so both processes can append concurrently
+    while readers query by repository, event type, sender or time range.
+    Repositories are interned once in their own table; event rows only keep
+    a repository id.
+
+    Only the newest ``max_events`` (and, with ``max_age``, the recent ones)
+    stay in the table. Older events are rotated, ``segment_events`` at a
+    time, into compressed archive segments under ``archive_dir``, and the
+    oldest segments are deleted past ``archive_max_bytes``. The
+    materialized repository stats keep counting archived events.
+    """
+
+    def __init__(self,path:Path=DB_FILE,max_events:Optional[int]=MAX_EVENTS,legacy_file:Optional[Path]=LEGACY_EVENTS_FILE,
+                 max_age:float=HOT_MAX_AGE,segment_events:int=SEGMENT_EVENTS,archive_dir:Optional[Path]=None,
+                 archive_max_bytes:int=ARCHIVE_MAX_BYTES):
+        self.path=Path(path)
+        self.max_events=max_events
+        self.legacy_file=legacy_file
+        self.max_age=max_age
+        self.segment_events=segment_events
+        self.archive_dir=Path(archive_dir) if archive_dir else self.path.with_name(f"{self.path.stem}_archive")
+        self.archive_max_bytes=archive_max_bytes
+        self._oldest_id=0
+        self._next_age_check=0.0
+        self._segment_index:tuple[tuple,list[Segment]]=((),[])
+        self._segment_rows=TTLCache(maxsize=SEGMENT_CACHE_SIZE,ttl=3600)
+        self.rotations=0
+        self.deleted_segments=0
+        self._local=threading.local()
+        self._init_lock=threading.Lock()
+        self._initialized=False
+        self._repo_ids:dict[str,int]={}
+
+    def _connect(self)->sqlite3.Connection:
+        conn=getattr(self._local,"conn",None)
+        if conn is None:
+            conn=sqlite3.connect(self.path,timeout=30,isolation_level=None)
+            # Only takes effect while the database is still empty.
+            conn.execute(f"PRAGMA page_size={PAGE_SIZE}")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn=conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._initialize(conn)
+                    self._initialized=True
+        return conn
+
+    def _initialize(self,conn:sqlite3.Connection):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            migrated=False
+            user_version=conn.execute("PRAGMA user_version").fetchone()[0]
+            columns={row[1] for row in conn.execute("PRAGMA table_info(events)")}
+            if "data" in columns:
+                self._migrate_v1(conn)
+                migrated=True
+            else:
+                _create_schema(conn)
+            empty=conn.execute("SELECT 1 FROM events LIMIT 1").fetchone() is None
+            if empty and self.legacy_file and Path(self.legacy_file).exists():
+                self._import_legacy(conn,self.legacy_file)
+                self._rebuild_stats(conn)
+            elif user_version<3:
+                self._rebuild_stats(conn)
+            if user_version<5:
+                self._migrate_utc(conn)
+            if user_version<6:
+                # Lookups by repository already use the primary keys; these only cost space.
+                conn.execute("DROP INDEX IF EXISTS idx_repo_stats_latest")
+                conn.execute("DROP INDEX IF EXISTS idx_pull_requests_state")
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if migrated:
+            conn.execute("VACUUM")
+
+    def _migrate_v1(self,conn:sqlite3.Connection):
+        """Rewrite a v1 store (full event JSON per row) into the compact schema."""
+        conn.execute("ALTER TABLE events RENAME TO events_v1")
+        for index in ("idx_events_repository","idx_events_event_type","idx_events_sender","idx_events_timestamp"):
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+        _create_schema(conn)
+        rows=[self._row(codec.loads(data),conn) for (data,) in conn.execute("SELECT data FROM events_v1 ORDER BY id")]
+        conn.executemany(INSERT_SQL,rows)
+        conn.execute("DROP TABLE events_v1")
+
+    def _migrate_utc(self,conn:sqlite3.Connection):
+        """Rewrite timestamps stored with a local UTC offset (before v5) in UTC."""
+        for table,columns in (("events",("timestamp",)),("repo_stats",("latest_timestamp",)),
+                              ("pull_requests",("updated_at",)),("archive_segments",("first_timestamp","last_timestamp"))):
+            for column in columns:
+                values=[value for (value,) in conn.execute(f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL")]
+                conn.executemany(f"UPDATE {table} SET {column}=? WHERE {column}=?",
+                                 [(utc_timestamp(value),value) for value in values if utc_timestamp(value)!=value])
+
+    def _import_legacy(self,conn:sqlite3.Connection,legacy_file:Path)->int:
+        with open(legacy_file,"rb") as f:
+            try:
+                loaded=codec.loads(f.read())
+            except Exception:
+                return 0
+        if isinstance(loaded,dict):
+            loaded=loaded.get("events",[])
+        rows=[self._row(e,conn) for e in loaded if isinstance(e,dict) and "event_type" in e]
+        return conn.executemany(INSERT_SQL,rows).rowcount
+
+    def _repo_id(self,repository,conn:sqlite3.Connection)->Optional[int]:
+        if isinstance(repository,dict):
+            full_name=repository.get("full_name")
+            github_id=repository.get("id")
+            default_branch=repository.get("default_branch")
+        else:
+            full_name,github_id,default_branch=repository,None,None
+        if not full_name:
+            return None
+        repo_id=self._repo_ids.get(full_name)
+        if repo_id is None:
+            repo_id=conn.execute(
+                "INSERT INTO repositories(full_name,github_id,default_branch) VALUES(?,?,?) "
+                "ON CONFLICT(full_name) DO UPDATE SET "
+                "github_id=COALESCE(excluded.github_id,github_id), "
+                "default_branch=COALESCE(excluded.default_branch,default_branch) "
+                "RETURNING id",(full_name,github_id,default_branch)).fetchone()[0]
+            self._repo_ids[full_name]=repo_id
+        return repo_id
+
+    def _row(self,event:dict,conn:sqlite3.Connection)->tuple:
+        return (
+            event.get("event_id") or new_event_id(),
+            utc_timestamp(event.get("timestamp")),
+            event.get("event_type","unknown"),
+            event.get("action"),
+            self._repo_id(event.get("repository"),conn),
+            event.get("pr_number"),
+            event.get("title"),
+            event.get("description"),
+            event.get("sender"),
+            event.get("base_branch"),
+            event.get("compare_branch"),
+        )
+
+    # -------------------------Stats--------------------------------------------
+
+    def _update_stats(self,conn:sqlite3.Connection,seq:int,row:tuple):
+        """Fold one newly inserted event into the materialized repository stats."""
+        (_,timestamp,event_type,action,repo_id,pr_number,title,_,_,_,compare_branch)=row
+        if repo_id is None:
+            return
+        is_issue=event_type=="issues"
+        conn.execute(
+            "INSERT INTO repo_stats(repo_id,events,pushes,issues,issues_opened,issues_closed,"
+            "latest_seq,latest_event_type,latest_action,latest_timestamp) VALUES(?,1,?,?,?,?,?,?,?,?) "
+            "ON CONFLICT(repo_id) DO UPDATE SET events=events+1, pushes=pushes+excluded.pushes, "
+            "issues=issues+excluded.issues, issues_opened=issues_opened+excluded.issues_opened, "
+            "issues_closed=issues_closed+excluded.issues_closed, latest_seq=excluded.latest_seq, "
+            "latest_event_type=excluded.latest_event_type, latest_action=excluded.latest_action, "
+            "latest_timestamp=excluded.latest_timestamp",
+            (repo_id,int(event_type=="push"),int(is_issue),int(is_issue and action=="opened"),
+             int(is_issue and action=="closed"),seq,event_type,action,timestamp))
+        if event_type=="push":
+            conn.execute(
+                "INSERT INTO branch_pushes(repo_id,branch,pushes) VALUES(?,?,1) "
+                "ON CONFLICT(repo_id,branch) DO UPDATE SET pushes=pushes+1",
+                (repo_id,compare_branch or "unknown"))
+        elif event_type=="pull_request" and pr_number is not None:
+            state=PR_STATES.get(action)
+            if state is None:
+                conn.execute(
+                    "INSERT INTO pull_requests(repo_id,pr_number,state,title,updated_at) VALUES(?,?,'open',?,?) "
+                    "ON CONFLICT(repo_id,pr_number) DO UPDATE SET title=COALESCE(excluded.title,title), "
+                    "updated_at=excluded.updated_at",(repo_id,pr_number,title,timestamp))
+            else:
+                conn.execute(
+                    "INSERT INTO pull_requests(repo_id,pr_number,state,title,updated_at) VALUES(?,?,?,?,?) "
+                    "ON CONFLICT(repo_id,pr_number) DO UPDATE SET state=excluded.state, "
+                    "title=COALESCE(excluded.title,title), updated_at=excluded.updated_at",
+                    (repo_id,pr_number,state,title,timestamp))
+
+    def _rebuild_stats(self,conn:sqlite3.Connection):
+        """Recompute the materialized stats from the archived and stored events, oldest first.
+
+        Events in segments already trimmed from the archive are gone and no
+        longer counted.
+        """
+        for table in ("repo_stats","pull_requests","branch_pushes"):
+            conn.execute(f"DELETE FROM {table}")
+        for seq,row in self._archived_rows(conn):
+            self._update_stats(conn,seq,row)
+        rows=conn.execute(f"SELECT id,{','.join(COLUMNS)} FROM events ORDER BY id").fetchall()
+        for seq,*row in rows:
+            self._update_stats(conn,seq,tuple(row))
+
+    def _archived_rows(self,conn:sqlite3.Connection):
+        """(id, events table row) of every archived event, oldest first."""
+        # Read through ``conn``: this runs during initialization, before segments() may connect.
+        for (path,) in conn.execute("SELECT path FROM archive_segments ORDER BY first_id").fetchall():
+            try:
+                records=archive.read_segment(path)
+            except FileNotFoundError:
+                continue
+            for record in records:
+                (seq,event_id,timestamp,event_type,action,full_name,pr_number,title,description,sender,
+                 base_branch,compare_branch,_)=record
+                yield seq,(event_id,utc_timestamp(timestamp),event_type,action,self._repo_id(full_name,conn),
+                           pr_number,title,description,sender,base_branch,compare_branch)
+
+    # -------------------------Writes-------------------------------------------
+
+    def append(self,event:dict)->bool:
+        """Append one event. Returns False if an event with the same event_id is already stored."""
+        conn=self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row=self._row(event,conn)
+            cur=conn.execute(INSERT_SQL,row)
+            inserted=cur.rowcount>0
+            if inserted:
+                self._update_stats(conn,cur.lastrowid,row)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            self._repo_ids.clear()
+            raise
+        if inserted:
+            try:
+                self._maybe_rotate(conn,cur.lastrowid)
+            except Exception as e:
+                # The event is stored; rotation is retried on the next append.
+                print(f"⚠️ Event archive rotation failed: {e}")
+        return inserted
+
+    def migrate(self,legacy_file:Path)->int:
+        """Import a legacy github_events.json file into the store and compact the database."""
+        conn=self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            imported=self._import_legacy(conn,legacy_file)
+            self._rebuild_stats(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            self._repo_ids.clear()
+            raise
+        conn.execute("VACUUM")
+        return imported
+
+    # -------------------------Retention----------------------------------------
+
+    def _maybe_rotate(self,conn:sqlite3.Connection,last_id:int):
+        if self.max_events and last_id-self._oldest_id>=self.max_events+self.segment_events:
+            while self._rotate(conn,by_age=False):
+                pass
+        if self.max_age and time.monotonic()>=self._next_age_check:
+            self._next_age_check=time.monotonic()+AGE_CHECK_INTERVAL
+            while self._rotate(conn,by_age=True)==self.segment_events:
+                pass
+
+    def _rotate(self,conn:sqlite3.Connection,by_age:bool)->int:
+        """Move the oldest hot events into one new archive segment; returns how many moved.
+
+        Re-checked under the write lock, so when several processes share the
+        store only one of them archives a given range.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        segment=None
+        try:
+            rows=conn.execute(SELECT_SQL+" ORDER BY e.id LIMIT ?",(self.segment_events,)).fetchall()
+            if rows:
+                self._oldest_id=rows[0][0]
+            if by_age:
+                cutoff=time.time()-self.max_age
+                rows=rows[:next((i for i,row in enumerate(rows) if not _older_than(row[archive.TIMESTAMP],cutoff)),
+                                len(rows))]
+            else:
+                newest=conn.execute("SELECT MAX(id) FROM events").fetchone()[0]
+                if not rows or newest-rows[0][0]<self.max_events+self.segment_events:
+                    rows=[]
+            if not rows:
+                conn.execute("COMMIT")
+                return 0
+            segment=archive.write_segment(self.archive_dir,rows)
+            conn.execute(
+                "INSERT INTO archive_segments(path,first_id,last_id,first_timestamp,last_timestamp,events,bytes,"
+                "repositories,event_types) VALUES(?,?,?,?,?,?,?,?,?)",
+                (segment.path,segment.first_id,segment.last_id,segment.first_timestamp,segment.last_timestamp,
+                 segment.events,segment.bytes,codec.dumps_str(segment.repositories),codec.dumps_str(segment.event_types)))
+            conn.execute("DELETE FROM events WHERE id<=?",(segment.last_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            if segment is not None:
+                Path(segment.path).unlink(missing_ok=True)
+            raise
+        self._oldest_id=segment.last_id+1
+        self.rotations+=1
+        self._trim_archive(conn)
+        return len(rows)
+
+    def _trim_archive(self,conn:sqlite3.Connection):
+        """Delete the oldest segments until the archive fits in ``archive_max_bytes``."""
+        if not self.archive_max_bytes:
+            return
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                total=conn.execute("SELECT COALESCE(SUM(bytes),0) FROM archive_segments").fetchone()[0]
+                oldest=conn.execute("SELECT id,path FROM archive_segments ORDER BY id LIMIT 1").fetchone()
+                if total<=self.archive_max_bytes or oldest is None:
+                    conn.execute("COMMIT")
+                    return
+                conn.execute("DELETE FROM archive_segments WHERE id=?",(oldest[0],))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            # Unlinked after the commit: a crash in between leaves an orphan file, never a dangling index entry.
+            Path(oldest[1]).unlink(missing_ok=True)
+            self.deleted_segments+=1
+
+    def segments(self)->list[Segment]:
+        """Summary index of the archive, newest segment first."""
+        conn=self._connect()
+        marker=conn.execute("SELECT COUNT(*),MAX(id),MIN(id) FROM archive_segments").fetchone()
+        if marker!=self._segment_index[0]:
+            rows=conn.execute("SELECT id,path,first_id,last_id,first_timestamp,last_timestamp,events,bytes,"
+                              "repositories,event_types FROM archive_segments ORDER BY last_id DESC").fetchall()
+            segments=[Segment(*row[:8],codec.loads(row[8]),codec.loads(row[9])) for row in rows]
+            self._segment_index=(marker,segments)
+        return self._segment_index[1]
+
+    def _segment(self,segment:Segment)->Optional[list[tuple]]:
+        rows=self._segment_rows.get(segment.path)
+        if rows is None:
+            try:
+                rows=archive.read_segment(segment.path)
+            except FileNotFoundError:
+                # Deleted by another process trimming the archive since we read the index.
+                return None
+            self._segment_rows.set(segment.path,rows)
+        return rows
+
+    def _query_archive(self,limit:Optional[int],before_id:Optional[int],**filters)->list[EventRecord]:
+        """Archived matches, newest first, opening only segments whose summary may match."""
+        records=[]
+        for segment in self.segments():
+            if not segment.may_contain(before_id=before_id,**{k:v for k,v in filters.items() if k!="sender"}):
+                continue
+            rows=self._segment(segment)
+            for row in reversed(rows or ()):
+                if archive.matches(row,before_id=before_id,**filters):
+                    records.append(EventRecord(*row))
+                    if limit is not None and len(records)>=limit:
+                        return records
+        return records
+
+    # -------------------------Reads--------------------------------------------
+
+    def query(self,repository:Optional[str]=None,event_type:Optional[str]=None,sender:Optional[str]=None,
+              since:Optional[str]=None,until:Optional[str]=None,limit:Optional[int]=None,
+              before_id:Optional[int]=None,include_archive:bool=True)->list[EventRecord]:
+        """Return matching events, oldest first.
+
+        ``limit`` keeps the newest matches; pass the smallest ``id`` of one
+        page as ``before_id`` to get the next older page. When the hot table
+        has fewer than ``limit`` matches the rest come from the archive.
+        """
+        clauses,params=[],[]
+        if repository is not None:
+            clauses.append("e.repo_id=(SELECT id FROM repositories WHERE full_name=?)")
+            params.append(repository)
+        for column,value in (("e.event_type",event_type),("e.sender",sender)):
+            if value is not None:
+                clauses.append(f"{column}=?")
+                params.append(value)
+        if since is not None:
+            clauses.append("e.timestamp>=?")
+            params.append(since)
+        if until is not None:
+            clauses.append("e.timestamp<?")
+            params.append(until)
+        if before_id is not None:
+            clauses.append("e.id<?")
+            params.append(before_id)
+        sql=SELECT_SQL
+        if clauses:
+            sql+=" WHERE "+" AND ".join(clauses)
+        sql+=" ORDER BY e.id DESC"
+        if limit is not None:
+            sql+=" LIMIT ?"
+            params.append(limit)
+        records=[EventRecord(*row) for row in self._connect().execute(sql,params)]
+        if include_archive and (limit is None or len(records)<limit):
+            # Bounded by what the hot query returned, in case a rotation ran in between.
+            records+=self._query_archive(None if limit is None else limit-len(records),
+                                         records[-1].id if records else before_id,
+                                         repository=repository,event_type=event_type,sender=sender,
+                                         since=since,until=until)
+        records.reverse()
+        return records
+
+    def latest(self,repository:Optional[str]=None,event_type:Optional[str]=None)->Optional[EventRecord]:
+        records=self.query(repository=repository,event_type=event_type,limit=1)
+        return records[0] if records else None
+
+    def repository_stats(self,repository:Optional[str]=None)->list[RepositoryStats]:
+        """Materialized stats for one repository, or for every repository, most recently active first."""
+        conn=self._connect()
+        sql=("SELECT r.id, r.full_name, r.default_branch, s.events, s.pushes, s.issues, s.issues_opened, "
+             "s.issues_closed, s.latest_event_type, s.latest_action, s.latest_timestamp "
+             "FROM repo_stats s JOIN repositories r ON r.id=s.repo_id")
+        params=[]
+        if repository is not None:
+            sql+=" WHERE r.full_name=?"
+            params.append(repository)
+        sql+=" ORDER BY s.latest_seq DESC"
+        stats=[]
+        for repo_id,*values in conn.execute(sql,params).fetchall():
+            open_prs=[pr_number for (pr_number,) in conn.execute(
+                "SELECT pr_number FROM pull_requests WHERE repo_id=? AND state='open' ORDER BY pr_number",(repo_id,))]
+            closed_prs=conn.execute(
+                "SELECT COUNT(*) FROM pull_requests WHERE repo_id=? AND state='closed'",(repo_id,)).fetchone()[0]
+            branch_pushes=dict(conn.execute(
+                "SELECT branch,pushes FROM branch_pushes WHERE repo_id=? ORDER BY pushes DESC",(repo_id,)))
+            stats.append(RepositoryStats(*values,open_prs,closed_prs,branch_pushes))
+        return stats
+
+    def version(self)->int:
+        """Monotonic store version; changes whenever any process appends an event."""
+        row=self._connect().execute("SELECT seq FROM sqlite_sequence WHERE name='events'").fetchone()
+        return row[0] if row else 0
+
+    def stats(self)->dict:
+        conn=self._connect()
+        hot=conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        segments,archived,size=conn.execute(
+            "SELECT COUNT(*),COALESCE(SUM(events),0),COALESCE(SUM(bytes),0) FROM archive_segments").fetchone()
+        return {
+            "hot_events":hot,
+            "segments":segments,
+            "archived_events":archived,
+            "archive_bytes":size,
+            "rotations":self.rotations,
+            "deleted_segments":self.deleted_segments,
+        }
+
+    def close(self):
+        conn=getattr(self._local,"conn",None)
+        if conn is not None:
+            conn.close()
+            self._local.conn=None
+
+
+def _older_than(timestamp:Optional[str],cutoff:float)->bool:
+    """Whether an ISO-8601 event timestamp is before ``cutoff`` (epoch seconds); unparseable ones never are."""
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()<cutoff
+    except (TypeError,ValueError):
+        return False
+
+
+_store:Optional[EventStore]=None
+
+def get_store()->EventStore:
+    global _store
+    if _store is None:
+        _store=EventStore()
+    return _store
+
+
+if __name__=="__main__":
+    if len(sys.argv)<2 or sys.argv[1]!="migrate":
+        print("usage: python event_store.py migrate [legacy_events.json]")
+        sys.exit(2)
+    source=Path(sys.argv[2]) if len(sys.argv)>2 else LEGACY_EVENTS_FILE
+    store=EventStore(max_events=None,legacy_file=None)
+    print(f"✅ Imported {store.migrate(source)} events from {source} into {store.path}")
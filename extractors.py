@@ -0,0 +1,138 @@
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+# Maps a GitHub event type (the X-GitHub-Event header) to a function that pulls
+# the type-specific fields out of the raw webhook payload.
+EXTRACTORS:dict[str,Callable[[dict],dict]]={}
+
+
+def extractor(*event_types:str):
+    """Register the decorated function as the extractor for ``event_types``."""
+    def register(fn:Callable[[dict],dict])->Callable[[dict],dict]:
+        for event_type in event_types:
+            EXTRACTORS[event_type]=fn
+        return fn
+    return register
+
+
+def _fallback(payload:dict)->dict:
+    return {"title":payload.get("title",""),"description":payload.get("body","")}
+
+
+def _repository(payload:dict)->dict:
+    repository=payload.get("repository") or {}
+    return {
+        "id":repository.get("id"),
+        "full_name":repository.get("full_name"),
+        "default_branch":repository.get("default_branch"),
+    }
+
+
+def parse_utc(value:str)->str:
+    """Any ISO 8601 timestamp as an ISO 8601 UTC timestamp; naive ones are taken as UTC.
+
+    Raises ValueError if ``value`` is not ISO 8601.
+    """
+    parsed=datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed=parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def utc_timestamp(value)->Optional[str]:
+    """Stored form of an event timestamp: UTC, so timestamps compare correctly as text.
+
+    Epoch seconds (as in older event files) are converted too; anything else unparseable is kept.
+    """
+    if isinstance(value,(int,float)) and not isinstance(value,bool):
+        try:
+            return datetime.fromtimestamp(value,timezone.utc).isoformat()
+        except (OverflowError,OSError,ValueError):
+            return value
+    if not isinstance(value,str) or not value or value.endswith("+00:00"):
+        return value
+    try:
+        return parse_utc(value)
+    except ValueError:
+        return value
+
+
+def event_type_label(event_type:str)->str:
+    """Bounded metric label for an event type taken from a request: unknown types become "other"."""
+    return event_type if event_type in EXTRACTORS else "other"
+
+
+def repository_name(event:dict)->Optional[str]:
+    """Full name of the repository an event (stored record or raw payload) is about."""
+    repository=event.get("repository")
+    return repository.get("full_name") if isinstance(repository,dict) else repository
+
+
+def extract_event(event_type:str,payload:dict,event_id:Optional[str]=None,timestamp:Optional[str]=None)->dict:
+    """Normalize a raw webhook payload into the canonical stored event record."""
+    event={
+        "event_id":event_id,
+        "timestamp":timestamp,
+        "event_type":event_type,
+        "action":payload.get("action"),
+        "repository":_repository(payload),
+        "pr_number":None,
+        "title":"",
+        "description":"",
+        "sender":(payload.get("sender") or {}).get("login"),
+        "base_branch":None,
+        "compare_branch":None,
+    }
+    event.update(EXTRACTORS.get(event_type,_fallback)(payload))
+    return event
+
+
+# -----------------------------Extractors---------------------------------------
+
+@extractor("pull_request")
+def _pull_request(payload:dict)->dict:
+    pr=payload.get("pull_request")
+    if not pr:
+        return {}
+    return {
+        "pr_number":pr.get("number"),
+        "title":pr.get("title",""),
+        "description":pr.get("body",""),
+        "base_branch":(pr.get("base") or {}).get("ref"),
+        "compare_branch":(pr.get("head") or {}).get("ref"),
+    }
+
+
+@extractor("push")
+def _push(payload:dict)->dict:
+    fields={}
+    ref=payload.get("ref","")
+    if ref:
+        fields["compare_branch"]=ref.removeprefix("refs/heads/")
+    commits=payload.get("commits",[])
+    if commits:
+        fields["title"]=f"{len(commits)} commits pushed"
+        fields["description"]="\n".join(commit.get("message",'') for commit in commits)
+    return fields
+
+
+@extractor("issues")
+def _issues(payload:dict)->dict:
+    issue=payload.get("issue",{})
+    return {"title":issue.get("title",''),"description":issue.get("body",'')}
+
+
+@extractor("release")
+def _release(payload:dict)->dict:
+    release=payload.get("release",{})
+    return {"title":release.get("name",release.get("tag_name","")),"description":release.get("body",'')}
+
+
+@extractor("create")
+def _create(payload:dict)->dict:
+    return {"title":f"Created {payload.get('ref_type','')}: {payload.get('ref','')}","description":""}
+
+
+@extractor("delete")
+def _delete(payload:dict)->dict:
+    return {"title":f"Deleted {payload.get('ref_type','')}: {payload.get('ref','')}","description":""}
@@ -0,0 +1,260 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, ClientError
+import codec
+from bus import shard_for
+from extractors import repository_name
+
+MANAGER_NOTIFY_URL=os.environ.get("MANAGER_NOTIFY_URL","http://localhost:8001/notify")
+OUTBOX_FILE=Path(__file__).parent / "forward_outbox.db"
+FORWARD_QUEUE_SIZE=int(os.environ.get("FORWARD_QUEUE_SIZE","1000"))
+FORWARD_WORKERS=int(os.environ.get("FORWARD_WORKERS","4"))
+FORWARD_DRAIN_TIMEOUT=float(os.environ.get("FORWARD_DRAIN_TIMEOUT","10"))
+# Error responses from the manager before an event is dead-lettered; connection failures don't count.
+FORWARD_MAX_ATTEMPTS=int(os.environ.get("FORWARD_MAX_ATTEMPTS","8"))
+# 4xx answers that mean "try again later" rather than "this event is bad".
+RETRYABLE_STATUSES={408,425,429}
+JSON_HEADERS={"Content-Type":"application/json"}
+
+
+class Outbox:
+    """Durable on-disk queue of events not yet acknowledged by the manager."""
+
+    def __init__(self,path:Path=OUTBOX_FILE):
+        self.lock=threading.Lock()
+        self.conn=sqlite3.connect(path,timeout=30,isolation_level=None,check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS outbox(id INTEGER PRIMARY KEY AUTOINCREMENT, payload BLOB NOT NULL)")
+        if "repository" not in {row[1] for row in self.conn.execute("PRAGMA table_info(outbox)")}:
+            self.conn.execute("ALTER TABLE outbox ADD COLUMN repository TEXT")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS dead_letters(id INTEGER PRIMARY KEY, payload BLOB NOT NULL, "
+                          "repository TEXT, reason TEXT, failed_at REAL NOT NULL)")
+
+    def put(self,event:dict)->int:
+        payload=codec.dumps(event)
+        with self.lock:
+            return self.conn.execute("INSERT INTO outbox(payload,repository) VALUES(?,?)",
+                                     (payload,repository_name(event))).lastrowid
+
+    def get(self,outbox_id:int)->Optional[bytes]:
+        """The encoded event, ready to be posted as-is."""
+        with self.lock:
+            row=self.conn.execute("SELECT payload FROM outbox WHERE id=?",(outbox_id,)).fetchone()
+        if row is None:
+            return None
+        return row[0].encode() if isinstance(row[0],str) else row[0]
+
+    def ack(self,outbox_id:int):
+        with self.lock:
+            self.conn.execute("DELETE FROM outbox WHERE id=?",(outbox_id,))
+
+    def bury(self,outbox_id:int,reason:str):
+        """Move an event the manager will not accept to the dead-letter table."""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("INSERT OR REPLACE INTO dead_letters(id,payload,repository,reason,failed_at) "
+                                  "SELECT id,payload,repository,?,? FROM outbox WHERE id=?",
+                                  (reason,time.time(),outbox_id))
+                self.conn.execute("DELETE FROM outbox WHERE id=?",(outbox_id,))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def pending(self,limit:int)->list[tuple[int,Optional[str]]]:
+        """Oldest undelivered events as (id, repository)."""
+        with self.lock:
+            return self.conn.execute("SELECT id,repository FROM outbox ORDER BY id LIMIT ?",(limit,)).fetchall()
+
+    def dead_letters(self)->int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class DeliveryRejected(Exception):
+    """The manager refused an event (4xx) or kept failing it; retrying will not help."""
+
+
+class ManagerForwarder:
+    """At-least-once delivery of webhook events to the main agent's /notify endpoint.
+
+    Every event is written to the outbox before ``submit`` returns, then
+    handed to one of a few workers sharing one pooled client session. Each
+    repository always goes to the same worker, which delivers its events
+    one at a time, so they reach the manager in order. When a worker's
+    queue is full the event stays parked in the outbox, along with every
+    later event for that worker, until a periodic sweep picks them up in
+    order, so ingest never blocks on a slow or restarting manager.
+
+    Events are removed from the outbox once the manager answers 2xx. An
+    event answered with a non-retryable 4xx, or with errors
+    ``max_attempts`` times, is moved to the dead-letter table instead.
+    Connection failures are retried without limit: the manager being down
+    says nothing about the event.
+    """
+
+    def __init__(self,url:str=MANAGER_NOTIFY_URL,outbox_path:Path=OUTBOX_FILE,queue_size:int=FORWARD_QUEUE_SIZE,
+                 workers:int=FORWARD_WORKERS,drain_timeout:float=FORWARD_DRAIN_TIMEOUT,
+                 max_attempts:int=FORWARD_MAX_ATTEMPTS,sweep_interval:float=5.0,backoff_base:float=0.5,
+                 backoff_max:float=30.0):
+        self.url=url
+        self.outbox_path=outbox_path
+        self.queue_size=queue_size
+        self.workers=workers
+        self.drain_timeout=drain_timeout
+        self.max_attempts=max_attempts
+        self.sweep_interval=sweep_interval
+        self.backoff_base=backoff_base
+        self.backoff_max=backoff_max
+        self.outbox:Optional[Outbox]=None
+        self._queues:list[asyncio.Queue]=[]
+        self._queued:set[int]=set()
+        # Workers with events parked in the outbox; new events for them are parked too, to keep their order.
+        self._parked_workers:set[int]=set()
+        # Workers that parked an event while the sweep was reading the outbox, which it may not have seen.
+        self._parked_during_scan:set[int]=set()
+        self._scanning=False
+        self._tasks:list[asyncio.Task]=[]
+        self._session:Optional[ClientSession]=None
+        self.delivered=0
+        self.retries=0
+        self.parked=0
+        self.dead_lettered=0
+
+    async def start(self):
+        self.outbox=await asyncio.to_thread(Outbox,self.outbox_path)
+        self._queues=[asyncio.Queue(maxsize=max(1,self.queue_size//self.workers)) for _ in range(self.workers)]
+        self._session=ClientSession(connector=TCPConnector(limit=self.workers,keepalive_timeout=60),
+                                    timeout=ClientTimeout(total=50))
+        self._tasks=[asyncio.create_task(self._worker(q)) for q in self._queues]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+        await self._enqueue_pending()
+
+    async def submit(self,event:dict):
+        outbox_id=await asyncio.to_thread(self.outbox.put,event)
+        index=shard_for(repository_name(event),self.workers)
+        if index in self._parked_workers:
+            self._park(index)
+        else:
+            self._enqueue(outbox_id,index)
+
+    def _park(self,index:int):
+        self.parked+=1
+        self._parked_workers.add(index)
+        if self._scanning:
+            self._parked_during_scan.add(index)
+
+    def _enqueue(self,outbox_id:int,index:int)->bool:
+        """Queue an event for worker ``index``; False if that queue is full and it stays parked."""
+        if outbox_id in self._queued:
+            return True
+        try:
+            self._queues[index].put_nowait(outbox_id)
+            self._queued.add(outbox_id)
+            return True
+        except asyncio.QueueFull:
+            self._park(index)
+            return False
+
+    async def _enqueue_pending(self):
+        limit=self.queue_size+len(self._queued)
+        self._scanning=True
+        self._parked_during_scan=set()
+        try:
+            pending=await asyncio.to_thread(self.outbox.pending,limit)
+        finally:
+            self._scanning=False
+        blocked=set()
+        for outbox_id,repository in pending:
+            index=shard_for(repository,self.workers)
+            if index not in blocked and not self._enqueue(outbox_id,index):
+                blocked.add(index)
+        # A worker is caught up once the sweep saw the whole outbox and queued all of its events,
+        # and parked nothing while the outbox was being read.
+        still_parked=blocked if len(pending)<limit else self._parked_workers|blocked
+        self._parked_workers=still_parked|self._parked_during_scan
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            await self._enqueue_pending()
+
+    async def _worker(self,queue:asyncio.Queue):
+        while True:
+            outbox_id=await queue.get()
+            try:
+                payload=await asyncio.to_thread(self.outbox.get,outbox_id)
+                if payload is not None:
+                    try:
+                        await self._deliver(payload)
+                    except DeliveryRejected as e:
+                        print(f"❌ Event {outbox_id} moved to the dead-letter table: {e}")
+                        await asyncio.to_thread(self.outbox.bury,outbox_id,str(e))
+                        self.dead_lettered+=1
+                    else:
+                        await asyncio.to_thread(self.outbox.ack,outbox_id)
+                        self.delivered+=1
+            finally:
+                self._queued.discard(outbox_id)
+                queue.task_done()
+
+    async def _deliver(self,payload:bytes):
+        attempt=0
+        failures=0
+        while True:
+            try:
+                async with self._session.post(self.url,data=payload,headers=JSON_HEADERS) as rep:
+                    print("sent event to manager response status: ",rep.status)
+                    if 200<=rep.status<300:
+                        return
+                    print(f"Notify failed with status {rep.status}")
+                    if 400<=rep.status<500 and rep.status not in RETRYABLE_STATUSES:
+                        raise DeliveryRejected(f"manager answered {rep.status}")
+                    failures+=1
+                    if failures>=self.max_attempts:
+                        raise DeliveryRejected(f"manager answered {rep.status} {failures} times")
+            except (ClientError,asyncio.TimeoutError) as notify_error:
+                print("❌ Failed to notify manager agent:", notify_error)
+            self.retries+=1
+            await asyncio.sleep(random.uniform(0,min(self.backoff_max,self.backoff_base*2**attempt)))
+            attempt+=1
+
+    async def stop(self):
+        """Drain queued events for up to ``drain_timeout`` seconds; anything left stays in the outbox."""
+        if not self._queues:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues)),timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Forwarder stopped with {len(self._queued)} queued events left in the outbox")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks,return_exceptions=True)
+        await self._session.close()
+        self.outbox.close()
+
+    def stats(self)->dict:
+        return {
+            "queue_depth":sum(q.qsize() for q in self._queues),
+            "delivered":self.delivered,
+            "retries":self.retries,
+            "parked":self.parked,
+            "parked_workers":len(self._parked_workers),
+            "dead_lettered":self.dead_lettered,
+        }
@@ -1,17 +1,19 @@
 import asyncio
-from agents import (Agent,Runner,
+import os
+from agents import (Agent,
                     GuardrailFunctionOutput,
                     RunContextWrapper,TResponseInputItem,input_guardrail)
 from agents.tool import function_tool
-from typing import List, Optional
+from typing import Optional
 from pydantic import BaseModel
-from pathlib import Path
-import json
+import codec
+from event_store import EventRecord, get_store
+from extractors import parse_utc
+from cache import VersionedCache
+from guardrail_policy import check_input
 from dotenv import load_dotenv
 load_dotenv()
 
-EVENTS_FILE=Path(__file__).parent / "github_events.json"
-
 # --------------------------Guardrail-------------------------------------------------
 
 class GithubSecurityCheckup(BaseModel):
@@ -31,84 +33,125 @@ async def security_guardrail(
     ctx:RunContextWrapper[None],
     agent:Agent,
     input:str|list[TResponseInputItem])->GuardrailFunctionOutput:
-    result= await Runner.run(guardrail_agent,input,context=ctx.context)
-    return GuardrailFunctionOutput(output_info=result.final_output, tripwire_triggered=result.final_output.is_unsafe)
+    return await check_input(guardrail_agent,ctx,input)
 
 
 # --------------------HostTool--------------------------------------------------
 
-class Event(BaseModel):
-    type:str
-    action:Optional[str]=None
-    repository:Optional[str]=None
-    title:Optional[str]=None
-    description:Optional[str]=None
-    sender:Optional[str]=None
-    pr_number:Optional[int]=None
-    timestamp:Optional[str]=None
-    base_branch:Optional[str]=None
-    compare_branch:Optional[str]=None
-
-class EventList(BaseModel):
-    events:List[Event]
+# Fields returned when the caller doesn't ask for specific ones; descriptions are opt-in.
+EVENT_FIELDS=("id","event_type","action","repository","pr_number","title","description","sender","timestamp",
+              "base_branch","compare_branch")
+DEFAULT_FIELDS=("id","timestamp","event_type","action","repository","pr_number","title","sender","compare_branch")
+DEFAULT_PAGE_SIZE=int(os.environ.get("GITHUB_TOOL_PAGE_SIZE","10"))
+MAX_PAGE_SIZE=50
+# Rough per-call output budget (~4 characters per token).
+TOOL_TOKEN_BUDGET=int(os.environ.get("GITHUB_TOOL_TOKEN_BUDGET","1200"))
+DESCRIPTION_CHARS=200
+EVENTS_CACHE_SIZE=int(os.environ.get("GITHUB_TOOL_CACHE_SIZE","512"))
+EVENTS_CACHE_TTL=float(os.environ.get("GITHUB_TOOL_CACHE_TTL","3600"))
+
+
+# Tool results, reused until the event store changes.
+events_cache=VersionedCache(maxsize=EVENTS_CACHE_SIZE,ttl=EVENTS_CACHE_TTL)
+
+
+def _project(record:EventRecord,fields:tuple[str,...])->dict:
+    event={}
+    for field in fields:
+        value=getattr(record,field)
+        if value is None or value=="":
+            continue
+        if field=="description" and len(value)>DESCRIPTION_CHARS:
+            value=value[:DESCRIPTION_CHARS]+"…"
+        event[field]=value
+    return event
+
+
+def recent_events_page(repository:Optional[str]=None,event_type:Optional[str]=None,sender:Optional[str]=None,
+                       since:Optional[str]=None,until:Optional[str]=None,limit:int=DEFAULT_PAGE_SIZE,
+                       cursor:Optional[int]=None,fields:Optional[list[str]]=None,
+                       token_budget:int=TOOL_TOKEN_BUDGET)->str:
+    """Newest-first JSON page of matching events, cut to ``token_budget``."""
+    # Unknown field names are dropped; if none are left, fall back to the defaults.
+    fields=tuple(f for f in fields or () if f in EVENT_FIELDS) or DEFAULT_FIELDS
+    # Stored timestamps are UTC, so the bounds must be too before comparing them as text.
+    try:
+        since=parse_utc(since) if since else None
+        until=parse_utc(until) if until else None
+    except ValueError as e:
+        return codec.dumps_str({"error":f"since/until must be ISO 8601 timestamps: {e}"})
+    limit=max(1,min(limit,MAX_PAGE_SIZE))
+    # One extra row tells us whether there is another page.
+    records=get_store().query(repository=repository,event_type=event_type,sender=sender,since=since,until=until,
+                              limit=limit+1,before_id=cursor)
+    records.reverse()
+    more=len(records)>limit
+    events=[]
+    used=0
+    for record in records[:limit]:
+        event=_project(record,fields)
+        size=len(codec.dumps_str(event))//4+1
+        if events and used+size>token_budget:
+            more=True
+            break
+        events.append(event)
+        used+=size
+    page={"events":events}
+    if more and events:
+        page["next_cursor"]=records[len(events)-1].id
+    return codec.dumps_str(page)
+
+
+def _load_repository_status(repository:Optional[str]=None)->str:
+    stats=get_store().repository_stats(repository)
+    if not stats:
+        return "No events recorded yet for this repository."
+    summary=[]
+    for repo in stats:
+        open_prs=", ".join(f"#{n}" for n in repo.open_prs)
+        branches=", ".join(f"{branch}: {count}" for branch,count in repo.branch_pushes.items())
+        if summary:
+            summary.append("")
+        summary.append(f"Repository: {repo.repository}")
+        summary.append(f"Open PRs: {len(repo.open_prs)}"+(f" ({open_prs})" if open_prs else ""))
+        summary.append(f"Closed PRs: {repo.closed_prs}")
+        summary.append(f"Pushes: {repo.pushes}"+(f" ({branches})" if branches else ""))
+        summary.append(f"Issues: {repo.issues} (opened: {repo.issues_opened}, closed: {repo.issues_closed})")
+        summary.append(f"Latest activity: {repo.latest_event_type}({repo.latest_action}) at {repo.latest_timestamp}")
+    return "\n".join(summary)
 
 
 @function_tool
-def get_recent_events() -> EventList:
-    if not EVENTS_FILE.exists():
-        return EventList(events=[])
-    with open(EVENTS_FILE) as f:
-        raw_events = json.load(f)
-
-    events = []
-    for e in raw_events:
-        events.append(Event(
-            type=e.get("event_type", ""),
-            action=e.get("action"),
-            repository=e.get("repository", {}).get("full_name"),
-            title=e.get("title") or e.get("head_commit", {}).get("message"),
-            description=e.get("description") or (
-                e.get("commits", [{}])[0].get("message") if "commits" in e else None
-            ),
-            sender=e.get("sender", {}).get("login"),
-            pr_number=e.get("number"),
-            timestamp=e.get("head_commit", {}).get("timestamp") if "head_commit" in e else e.get("created_at"),
-            base_branch=e.get("repository", {}).get("default_branch"),
-            compare_branch=e.get("ref")
-        ))
-
-    return EventList(events=events)
+def get_recent_events(repository:Optional[str]=None,event_type:Optional[str]=None,sender:Optional[str]=None,
+                      since:Optional[str]=None,until:Optional[str]=None,limit:int=DEFAULT_PAGE_SIZE,
+                      cursor:Optional[int]=None,fields:Optional[list[str]]=None)->str:
+    """Recent GitHub events, newest first, as JSON.
+
+    Args:
+        repository: Only events for this "owner/name" repository.
+        event_type: Only this event type, e.g. "push", "pull_request" or "issues".
+        sender: Only events by this GitHub login.
+        since: Only events at or after this ISO 8601 timestamp.
+        until: Only events before this ISO 8601 timestamp.
+        limit: Maximum number of events to return (at most 50).
+        cursor: The "next_cursor" of the previous page, to fetch older events.
+        fields: Event fields to include; "description" is left out unless asked for.
+    """
+    if all(arg is None for arg in (repository,event_type,sender,since,until,cursor,fields)) and limit==DEFAULT_PAGE_SIZE:
+        return events_cache.get("recent_events",get_store().version(),recent_events_page)
+    return recent_events_page(repository,event_type,sender,since,until,limit,cursor,fields)
 
 @function_tool
-def get_repository_status()->str:
-    if not EVENTS_FILE.exists():
-        return "No events recorded yet for this repository.."
-    with open(EVENTS_FILE) as f:
-        events=json.load(f)
-    if not events:
-        return "No events recorded yet for this repository."
-    pr_events=[e for e in events if e.get("event_type")=="pull_request"]
-    push_events=[e for e in events if e.get("event_type")=="push"]
-    issue_events=[e for e in events if e.get("event_type")=="issues"]
-    summary=[]
-    summary.append(f"Repository: {events[-1].get('repository',{}).get('full_name','unknown')}")
-    summary.append(f"Open PRs: {len(pr_events)}")
-    summary.append(f"Pushes: {len(push_events)}")
-    summary.append(f"Issues: {len(issue_events)}")
-    summary.append(f"Latest activity: {events[-1].get('event_type')}({events[-1].get('action')}) at {events[-1].get('timestamp')}")
-    return "\n".join(summary)
+def get_repository_status(repository:Optional[str]=None)->str:
+    """Open/closed PRs, pushes per branch, issues and latest activity for a repository (all repositories if omitted)."""
+    return events_cache.get(("repository_status",repository),get_store().version(),
+                            lambda: _load_repository_status(repository))
 
 
 
-@function_tool
-def summarize_latest_event(input: EventList) -> str:
-    events = input.events
-    if not events:
-        return "No GitHub events received yet."
-    
-    latest = events[-1]
+def format_event_summary(latest:EventRecord) -> str:
     return (
-        f"🔔 New GitHub event: {latest.type or 'N/A'}({latest.action}) on repository: {latest.repository or 'N/A'}\n"
+        f"🔔 New GitHub event: {latest.event_type or 'N/A'}({latest.action}) on repository: {latest.repository or 'N/A'}\n"
         f"- Title: {latest.title or 'N/A'}\n"
         f"- Description: {latest.description or 'N/A'}\n"
         f"- Timestamp: {latest.timestamp or 'N/A'}\n"
@@ -117,11 +160,26 @@ def summarize_latest_event(input: EventList) -> str:
         f"- Compare Branch: {latest.compare_branch or 'N/A'}"
     )
 
+
+def _load_latest_summary(repository:Optional[str]=None,event_type:Optional[str]=None)->str:
+    latest=get_store().latest(repository,event_type)
+    if latest is None:
+        return "No GitHub events received yet."
+    return format_event_summary(latest)
+
+
+@function_tool
+def summarize_latest_event(repository:Optional[str]=None,event_type:Optional[str]=None) -> str:
+    """Summary of the most recent GitHub event, optionally for one repository or event type."""
+    return events_cache.get(("latest_summary",repository,event_type),get_store().version(),
+                            lambda: _load_latest_summary(repository,event_type))
+
 # ---------------- gtihub Agent------------------------------------------------
 
 github_agent=Agent(
     name="github Agent",
-    instructions="You are github agent to response to github events and actions",
+    instructions=("You are github agent to response to github events and actions. "
+                  "Filter get_recent_events by repository, type, sender or time instead of paging through everything."),
     model="gpt-5-nano",
     input_guardrails=[security_guardrail],
     tools=[get_recent_events,summarize_latest_event,get_repository_status]
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from enum import Enum
+from agents import Agent, Runner, GuardrailFunctionOutput, RunContextWrapper, TResponseInputItem
+from cache import TTLCache
+from dotenv import load_dotenv
+load_dotenv()
+
+GUARDRAIL_CACHE_SIZE=int(os.environ.get("GUARDRAIL_CACHE_SIZE","1024"))
+GUARDRAIL_CACHE_TTL=float(os.environ.get("GUARDRAIL_CACHE_TTL","600"))
+
+# ------------------------------Trust-------------------------------------------
+
+class TrustLevel(str, Enum):
+    UNTRUSTED="untrusted"
+    TRUSTED="trusted"
+
+
+@dataclass
+class GuardrailContext:
+    """Run context for agent runs; inputs we generate ourselves are marked TRUSTED."""
+    trust:TrustLevel=TrustLevel.UNTRUSTED
+
+
+def is_trusted(context)->bool:
+    return getattr(context,"trust",TrustLevel.UNTRUSTED)==TrustLevel.TRUSTED
+
+
+# ---------------------------Verdict cache--------------------------------------
+
+verdict_cache=TTLCache(maxsize=GUARDRAIL_CACHE_SIZE,ttl=GUARDRAIL_CACHE_TTL)
+
+_WHITESPACE=re.compile(r"\s+")
+
+
+def input_text(input:str|list[TResponseInputItem])->str:
+    if isinstance(input,str):
+        return input
+    if isinstance(input,list):
+        parts=[]
+        for i in input:
+            if isinstance(i,dict):
+                content=i.get("content",i.get("text",""))
+                if isinstance(content,list):
+                    content=" ".join(c.get("text","") for c in content if isinstance(c,dict))
+                parts.append(str(content))
+            else:
+                parts.append(getattr(i,"text",str(i)))
+        return " ".join(parts)
+    return str(input)
+
+
+def latest_user_input(input:str|list[TResponseInputItem])->str|list[TResponseInputItem]:
+    """The newest user message; session runs pass the whole history to guardrails."""
+    if isinstance(input,list):
+        for i in reversed(input):
+            if isinstance(i,dict) and i.get("role")=="user":
+                return [i]
+    return input
+
+
+def verdict_key(guardrail:str,input:str|list[TResponseInputItem])->str:
+    normalized=_WHITESPACE.sub(" ",input_text(latest_user_input(input))).strip().lower()
+    return hashlib.sha256(f"{guardrail}\0{normalized}".encode()).hexdigest()
+
+
+async def check_input(
+    guardrail_agent:Agent,
+    ctx:RunContextWrapper,
+    input:str|list[TResponseInputItem])->GuardrailFunctionOutput:
+    """Run ``guardrail_agent`` on untrusted, not recently checked input.
+
+    Trusted inputs skip the model call, and verdicts are cached by a hash
+    of the normalized input so repeats skip it too.
+    """
+    if is_trusted(ctx.context):
+        return GuardrailFunctionOutput(output_info="trusted input, check skipped", tripwire_triggered=False)
+    key=verdict_key(guardrail_agent.name,input)
+    verdict=verdict_cache.get(key)
+    if verdict is None:
+        result=await Runner.run(guardrail_agent,input,context=ctx.context)
+        verdict=result.final_output
+        verdict_cache.set(key,verdict)
+    return GuardrailFunctionOutput(output_info=verdict, tripwire_triggered=verdict.is_unsafe)
@@ -0,0 +1,261 @@
+"""Offline end-to-end load generator for the webhook -> manager -> Slack pipeline.
+
+Replays the recorded events in github_events.json as GitHub webhooks against
+an in-process copy of ``webhook_server.app`` and the ``main_agent`` /notify
+handler. The OpenAI Runner is replaced by a fake with configurable latency
+and Slack by a local stub server, and every path the services write to
+lives in a temporary directory. Reports throughput, end-to-end latency
+percentiles (webhook sent -> Slack post received), drops and duplicates.
+
+    python loadgen.py --events 500 --rate 100 --shape burst --burst-size 50
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from aiohttp import web, ClientSession, TCPConnector
+
+import codec
+import event_store
+from dedup import Deduplicator
+from digest import EventCoalescer
+from event_store import EventStore, LEGACY_EVENTS_FILE
+from forwarder import ManagerForwarder
+from scheduler import EventScheduler
+
+MARKER=re.compile(r"loadgen-(\d+)")
+
+
+# ----------------------------Payloads------------------------------------------
+
+def recorded_payloads(legacy_file:Path=LEGACY_EVENTS_FILE)->list[tuple[str,dict]]:
+    """Rebuild raw webhook payloads from the recorded events."""
+    with open(legacy_file,"rb") as f:
+        records=[e for e in codec.loads(f.read()) if isinstance(e.get("repository"),dict)]
+    payloads=[]
+    for e in records:
+        payload={"action":e.get("action"),"repository":e["repository"],"sender":{"login":e.get("sender")}}
+        if e["event_type"]=="pull_request":
+            payload["pull_request"]={"number":e.get("pr_number") or 1,"title":e.get("title"),"body":e.get("description"),
+                                     "base":{"ref":e.get("base_branch") or "main"},"head":{"ref":e.get("compare_branch")}}
+        elif e["event_type"]=="push":
+            payload["ref"]=f"refs/heads/{e.get('compare_branch') or 'main'}"
+            payload["commits"]=[{"message":m} for m in (e.get("description") or "").split("\n") if m]
+        else:
+            payload["title"]=e.get("title")
+            payload["body"]=e.get("description")
+        payloads.append((e["event_type"],payload))
+    return payloads
+
+
+def send_schedule(count:int,rate:float,shape:str,burst_size:int)->list[float]:
+    """Offsets (seconds from start) at which each webhook is sent."""
+    if shape=="constant":
+        return [i/rate for i in range(count)]
+    if shape=="burst":
+        # Same average rate, delivered as back-to-back bursts.
+        return [(i//burst_size)*burst_size/rate for i in range(count)]
+    if shape=="ramp":
+        # Rate grows linearly from 0 to 2x the target over the run.
+        duration=count/rate
+        return [duration*((i+1)/count)**0.5 for i in range(count)]
+    raise ValueError(f"unknown shape: {shape}")
+
+
+# ----------------------------Stand-ins-----------------------------------------
+
+class SlackStub:
+    """Local Slack webhook that records when each tracked event is posted."""
+
+    def __init__(self,latency:float=0.0,rate_limit_ratio:float=0.0):
+        self.latency=latency
+        self.rate_limit_ratio=rate_limit_ratio
+        self.received:dict[int,list[float]]={}
+        self.posts=0
+
+    async def handle(self,request):
+        payload=await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if random.random()<self.rate_limit_ratio:
+            return web.Response(status=429,headers={"Retry-After":"1"},text="rate_limited")
+        now=time.perf_counter()
+        self.posts+=1
+        for seq in MARKER.findall(payload.get("text","")):
+            self.received.setdefault(int(seq),[]).append(now)
+        return web.Response(text="ok")
+
+
+class FakeResult:
+    def __init__(self,final_output):
+        self.final_output=final_output
+
+
+class FakeRunner:
+    """Stands in for agents.Runner: waits ``latency`` seconds, then does what slack_agent would."""
+
+    def __init__(self,post,latency:float):
+        self.post=post
+        self.latency=latency
+        self.runs=0
+
+    async def run(self,agent,input,**kwargs):
+        self.runs+=1
+        await asyncio.sleep(self.latency)
+        return FakeResult(await self.post(input))
+
+
+# ----------------------------Harness-------------------------------------------
+
+async def _serve(app:web.Application,port:int)->web.AppRunner:
+    runner=web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner,"localhost",port).start()
+    return runner
+
+
+def _percentile(samples:list[float],q:float)->float:
+    if not samples:
+        return 0.0
+    if len(samples)==1:
+        return samples[0]
+    return statistics.quantiles(samples,n=100,method="inclusive")[q-1]
+
+
+async def run_load(args)->dict:
+    import main_agent
+    import slack
+    import webhook_server
+
+    tmp=Path(tempfile.mkdtemp(prefix="loadgen-"))
+    webhook_url=f"http://localhost:{args.webhook_port}/webhook/github"
+    manager_url=f"http://localhost:{args.manager_port}/notify"
+    slack_url=f"http://localhost:{args.slack_port}/slack"
+
+    # Point every stateful component at the temporary directory and the stubs.
+    event_store._store=EventStore(tmp/"events.db",max_events=None,legacy_file=None)
+    webhook_server.app[webhook_server.FORWARDER]=ManagerForwarder(url=manager_url,outbox_path=tmp/"outbox.db")
+    webhook_server.deliveries=Deduplicator("webhook",path=tmp/"dedup.db")
+    main_agent.processed_events=Deduplicator("manager",path=tmp/"dedup.db")
+    slack.slack_client.webhook_url=slack_url
+    fake_runner=FakeRunner(slack.post_slack_message,args.model_latency)
+    main_agent.Runner=fake_runner
+    main_agent.SLACK_DISPATCH_MODE=args.dispatch
+    main_agent.coalescer=EventCoalescer(send=main_agent.dispatch_summary,render_single=main_agent.render_event_summary,
+                                        window=args.digest_window)
+    main_agent.scheduler=EventScheduler(handler=main_agent.handle_event,concurrency=args.concurrency,
+                                        spill_file=str(tmp/"spill.jsonl"))
+
+    stub=SlackStub(latency=args.slack_latency,rate_limit_ratio=args.slack_429_ratio)
+    slack_app=web.Application()
+    slack_app.router.add_post("/slack",stub.handle)
+    manager_app=web.Application()
+    manager_app.router.add_post("/notify",main_agent.notify)
+    runners=[await _serve(slack_app,args.slack_port),await _serve(manager_app,args.manager_port),
+             await _serve(webhook_server.app,args.webhook_port)]
+
+    templates=recorded_payloads()
+    sent_at:dict[int,float]={}
+    statuses:dict[int,int]={}
+    offsets=send_schedule(args.events,args.rate,args.shape,args.burst_size)
+    redeliveries=0
+
+    async with ClientSession(connector=TCPConnector(limit=args.client_connections)) as client:
+        async def send(seq:int,event_type:str,payload:dict,delivery_id:str):
+            async with client.post(webhook_url,data=codec.dumps(payload),
+                                   headers={"X-GitHub-Event":event_type,"X-GitHub-Delivery":delivery_id,
+                                            "Content-Type":"application/json"}) as rep:
+                statuses[rep.status]=statuses.get(rep.status,0)+1
+
+        start=time.perf_counter()
+        tasks=[]
+        for seq,(offset,(event_type,template)) in enumerate(zip(offsets,itertools.cycle(templates))):
+            delay=start+offset-time.perf_counter()
+            if delay>0:
+                await asyncio.sleep(delay)
+            payload={**template,"sender":{"login":f"loadgen-{seq}"}}
+            delivery_id=str(uuid.uuid4())
+            sent_at[seq]=time.perf_counter()
+            tasks.append(asyncio.create_task(send(seq,event_type,payload,delivery_id)))
+            if random.random()<args.redelivery_ratio:
+                redeliveries+=1
+                tasks.append(asyncio.create_task(send(seq,event_type,payload,delivery_id)))
+        await asyncio.gather(*tasks)
+        send_done=time.perf_counter()
+
+        deadline=send_done+args.drain_timeout
+        while len(stub.received)<len(sent_at) and time.perf_counter()<deadline:
+            await asyncio.sleep(0.05)
+        await main_agent.coalescer.close()
+        await asyncio.sleep(0.1)
+        end=time.perf_counter()
+
+    for runner in reversed(runners):
+        await runner.cleanup()
+    await main_agent.scheduler.close(timeout=1)
+    await slack.slack_client.close()
+
+    latencies=[(posts[0]-sent_at[seq])*1000 for seq,posts in stub.received.items()]
+    delivered=len(stub.received)
+    last_post=max((posts[0] for posts in stub.received.values()),default=end)
+    return {
+        "events_sent":len(sent_at),
+        "redeliveries_sent":redeliveries,
+        "webhook_statuses":{str(k):v for k,v in sorted(statuses.items())},
+        "delivered":delivered,
+        "dropped":len(sent_at)-delivered,
+        "duplicate_posts":sum(len(posts)-1 for posts in stub.received.values()),
+        "slack_messages":stub.posts,
+        "model_runs":fake_runner.runs,
+        "send_rate_per_sec":len(sent_at)/max(send_done-start,1e-9),
+        "throughput_per_sec":delivered/max(last_post-start,1e-9),
+        "latency_p50_ms":_percentile(latencies,50),
+        "latency_p95_ms":_percentile(latencies,95),
+        "latency_p99_ms":_percentile(latencies,99),
+        "latency_max_ms":max(latencies,default=0.0),
+    }
+
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events",type=int,default=200,help="number of webhooks to send")
+    parser.add_argument("--rate",type=float,default=50.0,help="average webhooks per second")
+    parser.add_argument("--shape",choices=["constant","burst","ramp"],default="constant")
+    parser.add_argument("--burst-size",type=int,default=25,help="webhooks per burst for --shape burst")
+    parser.add_argument("--redelivery-ratio",type=float,default=0.0,help="fraction of webhooks GitHub-style redelivered")
+    parser.add_argument("--dispatch",choices=["direct","agent"],default="direct",help="SLACK_DISPATCH_MODE to test")
+    parser.add_argument("--model-latency",type=float,default=1.5,help="fake model run latency in seconds (agent dispatch)")
+    parser.add_argument("--digest-window",type=float,default=0.0,help="coalescing window in seconds (0 disables)")
+    parser.add_argument("--concurrency",type=int,default=4,help="scheduler concurrency")
+    parser.add_argument("--slack-latency",type=float,default=0.02,help="stub Slack response latency in seconds")
+    parser.add_argument("--slack-429-ratio",type=float,default=0.0,help="fraction of Slack posts answered with 429")
+    parser.add_argument("--drain-timeout",type=float,default=30.0,help="seconds to wait for outstanding posts")
+    parser.add_argument("--client-connections",type=int,default=100)
+    parser.add_argument("--webhook-port",type=int,default=18080)
+    parser.add_argument("--manager-port",type=int,default=18001)
+    parser.add_argument("--slack-port",type=int,default=18002)
+    parser.add_argument("--slo-p95-ms",type=float,default=None,help="exit non-zero if p95 latency exceeds this")
+    parser.add_argument("--json",action="store_true",help="print machine-readable results")
+    args=parser.parse_args()
+
+    results=asyncio.run(run_load(args))
+    if args.json:
+        print(json.dumps(results,indent=2))
+    else:
+        for key,value in results.items():
+            print(f"  {key:<22} {value:,.2f}" if isinstance(value,float) else f"  {key:<22} {value}")
+    slo_ok=args.slo_p95_ms is None or (results["dropped"]==0 and results["latency_p95_ms"]<=args.slo_p95_ms)
+    if not slo_ok:
+        print(f"❌ SLO violated: p95 {results['latency_p95_ms']:.1f} ms (limit {args.slo_p95_ms} ms), dropped {results['dropped']}")
+    raise SystemExit(0 if slo_ok else 1)
+
+
+if __name__=="__main__":
+    main()
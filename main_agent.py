@@ -1,24 +1,40 @@
 from agents import (Agent, Runner, GuardrailFunctionOutput, 
                     InputGuardrailTripwireTriggered, RunContextWrapper,
-                    TResponseInputItem, input_guardrail, SQLiteSession, trace,set_trace_processors)
+                    TResponseInputItem, input_guardrail, trace)
 from github import github_agent
-from slack import slack_agent
+from slack import slack_agent, slack_client, post_slack_message
 from pydantic import BaseModel
 import asyncio
 from aiohttp import web
-import json
-import weave
-from weave.integrations.openai_agents.openai_agents import WeaveTracingProcessor
-from datetime import datetime
-import pytz
 import os
+import time
+from event_store import get_store
+import codec
+import metrics
+from dedup import Deduplicator, content_key
+from digest import EventCoalescer
+from extractors import event_type_label
+from scheduler import EventScheduler, PRIORITY_INTERACTIVE
+from guardrail_policy import GuardrailContext, TrustLevel, check_input, verdict_cache
+from github import events_cache
+from tracing import init_tracing
+from agents.exceptions import AgentsException
+from openai import APIError
 from openai.types.responses import ResponseTextDeltaEvent
+from router import ModelRouter
+from response_cache import ResponseCache, split_bypass
+from sessions import BudgetedSession, SessionManager
+from dataclasses import dataclass
+from typing import AsyncContextManager, Awaitable, Callable, Optional
+from agents.usage import Usage
+from streaming import (ClientLimiter, QUERY_MAX_CONCURRENT, QUERY_REQUESTS, StreamMeter, TooManyRequests,
+                       issue_client_id, sse_event, verify_client_id)
 
 from dotenv import load_dotenv
 load_dotenv()
 
-weave.init("openai-agents")
-set_trace_processors([WeaveTracingProcessor()])
+# "direct" posts rendered event summaries straight to Slack; "agent" routes them through slack_agent.
+SLACK_DISPATCH_MODE=os.environ.get("SLACK_DISPATCH_MODE","direct").lower()
 
 
 # --------------------Guardrail-------------------------------
@@ -44,34 +60,12 @@ guardrail_agent=Agent(
 )
 
 
-async def is_github_related(query:str)->bool:
-    """Detect if the user input is related to GitHub."""
-    github_keywords=["github","repository","repo","pull_request","event","pr","push","issue","create","delete"]
-    return any(word.lower() in query.lower() for word in github_keywords)
-
-
 @input_guardrail
 async def security_guardrail(
     ctx:RunContextWrapper[None],
     agent:Agent,
     input:str|list[TResponseInputItem])->GuardrailFunctionOutput:
-    if isinstance(input,str):
-        user_input=input
-    elif isinstance(input,list):
-        parts=[]
-        for i in input:
-            if isinstance(i,dict):
-                parts.append(i.get("text",""))
-            else:
-                parts.append(getattr(i,"text",str(i)))
-        user_input=" ".join(parts)
-    else:
-        user_input=str(input)
-
-    github_related=await is_github_related(user_input)
-    # selected_agent= related_guardrail_agent if github_related else unrelated_guardrail_agent
-    result= await Runner.run(guardrail_agent,input,context=ctx.context)
-    return GuardrailFunctionOutput(output_info=result.final_output, tripwire_triggered=result.final_output.is_unsafe)
+    return await check_input(guardrail_agent,ctx,input)
 
 
 
@@ -99,51 +93,68 @@ main_agent=Agent(
 
 # -------------------Create a session instance-----------------------------
 
-session=SQLiteSession("conversation_123")
+# Each interactive user gets their own token-budgeted history; event runs never share it.
+sessions=SessionManager()
+session=sessions.interactive()
+
+# One pre-built Main Agent per model tier, chosen per turn.
+router=ModelRouter(main_agent)
+
+# Answers to read-only GitHub questions, reused until the next event arrives.
+response_cache=ResponseCache()
 
 # ------------------------- notify----------------------------------------
 
+processed_events=Deduplicator("manager")
+# Where notify hands stored events: unset runs them here, server.py's sharded mode sets its worker bus.
+EVENT_SINK=web.AppKey("event_sink",object)
+
+def accept_event(data:dict):
+    """Hand a stored, de-duplicated event to the background pipeline."""
+    response_cache.invalidate()
+    scheduler.submit_event(data.get("event_type","unknown"),data)
+
 async def notify(request):
-    data = await request.json()
+    start = time.perf_counter()
+    body = await request.read()
+    try:
+        data = codec.loads(body)
+    except Exception as e:
+        # Retrying can't fix a body we can't decode; a 4xx lets the forwarder dead-letter it.
+        return web.json_response({"error":f"undecodable event: {e}"},status=400)
+    if not isinstance(data,dict):
+        return web.json_response({"error":"event must be a JSON object"},status=400)
     event_type = data.get("event_type","unknown")
+    label = event_type_label(event_type)
+    key = data.get("event_id") or content_key(event_type,body)
+    # The forwarder delivers at least once; run each event through the pipeline only once.
+    if not await processed_events.claim(key):
+        print(f"Skipping duplicate GitHub event: {event_type}")
+        metrics.INGEST_EVENTS.inc(endpoint="notify",event_type=label,outcome="duplicate")
+        return web.json_response({"status":"duplicate"})
     print(f"Received GitHub event: {event_type}")
-    ist_now=datetime.now(pytz.timezone("Asia/Kolkata")).isoformat()
-    sender=data.get("sender")
-    if isinstance(sender,dict):
-        sender_login=sender.get("login")
-    else:
-        sender_login=str(sender) if sender else None
-    event={
-        "event_type":event_type,
-        "timestamp":ist_now,
-        "action":data.get("action"),
-        "repository":data.get("repository",{}),
-        "pr_number":data.get("pull_request",{}).get("number"),
-        "title":data.get("pull_request",{}).get("title"),
-        "description":data.get("pull_request",{}).get("body"),
-        "sender":sender_login,
-        "base_branch":data.get("repository",{}).get("default_branch"),
-        "compare_branch":data.get("ref")
-    }
-    events=[]
-    if os.path.exists("github_events.json"):
-        with open("github_events.json") as f:
-            try:
-                events=json.load(f)
-            except Exception:
-                events=[]
-    events.append(event)
-    events=events[-100:]
-    with open("github_events.json","w") as f:
-        json.dump(events,f,indent=2)
-    asyncio.create_task(handle_event(event_type,data))
+    try:
+        with metrics.STORE_WRITE_SECONDS.time(endpoint="notify"):
+            await asyncio.to_thread(get_store().append,data)
+        sink=request.app.get(EVENT_SINK)
+        if sink is None:
+            accept_event(data)
+        else:
+            await sink.submit(data)
+    except Exception:
+        # Release the claim so the forwarder's retry is processed instead of answered "duplicate".
+        await processed_events.forget(key)
+        metrics.INGEST_EVENTS.inc(endpoint="notify",event_type=label,outcome="error")
+        raise
+    metrics.INGEST_EVENTS.inc(endpoint="notify",event_type=label,outcome="received")
+    metrics.INGEST_SECONDS.observe(time.perf_counter()-start,endpoint="notify",event_type=label)
     return web.json_response({"status":"ok"})
 
 
 
 
-async def handle_event(event_type, data):
-    summary = (
+def render_event_summary(event_type, data)->str:
+    return (
         f"🔔 New GitHub event: {event_type}({data.get('action')}) on repository: {data.get('repository',{}).get('full_name')}\n"
         f"- Title: {data.get('title')}\n"
         f"- Description: {data.get('description')}\n"
@@ -152,14 +163,44 @@ async def handle_event(event_type, data):
         f"- Base Branch: {data.get('base_branch')}\n"
         f"- Compare Branch: {data.get('compare_branch')}"
     )
-    print(summary)
+
+
+async def dispatch_summary(summary:str,repository:Optional[str]=None):
+    if SLACK_DISPATCH_MODE=="direct":
+        status = await post_slack_message(summary)
+        print("📨 Slack: ", status)
+        return
     try:
-        result = await Runner.run(slack_agent, summary, session=session)
+        result = await Runner.run(slack_agent, summary, session=sessions.for_event(repository),
+                                  context=GuardrailContext(trust=TrustLevel.TRUSTED))
         print("🤖 Assistant: ", result.final_output)
     except InputGuardrailTripwireTriggered:
         print("❌ Guardrail blocked unsafe event")
 
 
+coalescer=EventCoalescer(send=dispatch_summary, render_single=render_event_summary)
+
+
+async def handle_event(event_type, data):
+    print(render_event_summary(event_type, data))
+    await coalescer.add(event_type, data)
+
+
+scheduler=EventScheduler(handler=handle_event)
+
+metrics.register_stats("router",router.stats)
+metrics.register_stats("response_cache",response_cache.stats)
+metrics.register_stats("sessions",sessions.stats)
+metrics.register_stats("query_clients",lambda: query_limiter.stats())
+metrics.register_stats("scheduler",lambda: scheduler.stats())
+metrics.register_stats("digest",lambda: coalescer.stats())
+metrics.register_stats("manager_dedup",lambda: processed_events.stats())
+metrics.register_stats("slack_client",slack_client.stats)
+metrics.register_stats("events_cache",events_cache.stats)
+metrics.register_stats("guardrail_cache",verdict_cache.stats)
+metrics.register_stats("event_store",lambda: get_store().stats())
+
+
 
 
 
@@ -167,53 +208,209 @@ async def handle_event(event_type, data):
 
 async def ainput(prompt:str="")->str:
     return await asyncio.to_thread(input, prompt)
-async def repo_loop(agent:Agent,session:SQLiteSession):
+@dataclass
+class TurnOutcome:
+    answer:Optional[str]=None
+    model:Optional[str]=None
+    cached:bool=False
+    blocked:bool=False
+    error:Optional[str]=None
+    usage:Optional[Usage]=None
+
+
+def interactive_slot():
+    return scheduler.slot(PRIORITY_INTERACTIVE)
+
+
+async def answer_turn(user_input:str,session:BudgetedSession,emit:Callable[[str,str],Awaitable],
+                      slot:Callable[[],AsyncContextManager]=interactive_slot)->TurnOutcome:
+    """Answer one user turn, streaming through ``emit(kind, text)``.
+
+    ``kind`` is "model" when a model (or the cache) starts answering,
+    "delta" for answer text and "notice" for escalations. Each model run
+    holds ``slot()``; if the turn is cancelled the run is cancelled too.
+    """
+    user_input,bypass_cache=split_bypass(user_input)
+    cache_key=response_cache.key(user_input,await asyncio.to_thread(get_store().version),bypass_cache)
+    cached=response_cache.get(cache_key)
+    if cached is not None:
+        await session.add_items([{"role":"user","content":user_input},{"role":"assistant","content":cached}])
+        await emit("model","cached")
+        await emit("delta",cached)
+        return TurnOutcome(answer=cached,model="cached",cached=True)
+    with trace("Main Agent Workflow"):
+        decision=router.route(user_input)
+        print(f"user_input: {user_input} | github_related: {decision.github_related} | "
+              f"selected_model: {decision.model} | policy: {decision.policy} | "
+              f"routed_in: {decision.latency*1e6:.0f}µs")
+
+        while True:
+            agent=router.agent(decision)
+            try:
+                async with slot():
+                    session.mark()
+                    result=Runner.run_streamed(agent,user_input,session=session)
+                    try:
+                        await emit("model",agent.model)
+                        async for event in result.stream_events():
+                            if event.type=="raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                                await emit("delta",event.data.delta)
+                    finally:
+                        # Stop spending tokens on a run nobody is reading any more.
+                        if not result.is_complete:
+                            result.cancel()
+                if result.final_output:
+                    answer=str(result.final_output)
+                    response_cache.set(cache_key,answer)
+                    return TurnOutcome(answer=answer,model=agent.model,usage=result.context_wrapper.usage)
+                failure="empty response"
+            except InputGuardrailTripwireTriggered:
+                return TurnOutcome(model=agent.model,blocked=True)
+            except (AgentsException,APIError) as e:
+                failure=str(e) or type(e).__name__
+            failed=decision
+            decision=router.escalate(failed)
+            if decision is None:
+                return TurnOutcome(model=failed.model,error=failure)
+            # The failed run may already have saved the user's message; don't send it twice.
+            await session.rollback()
+            await emit("notice",f"{failed.model} failed ({failure}), escalating to {decision.model}")
+
+
+async def print_stream(kind:str,text:str):
+    if kind=="model":
+        print(f"🤖 Assistant({text}): ", end="",flush=True)
+    elif kind=="delta":
+        print(text,end="",flush=True)
+    else:
+        print(f"\n⚠️ {text}")
+
+
+async def repo_loop(agent:Agent,session:BudgetedSession):
     while True:
         user_input=await ainput("You:")
         if user_input.lower().strip() in {"exit","quit"}:
             print("👋 Exiting Loop")
             break
-        with trace("Main Agent Workflow"):
-            github_related=await is_github_related(user_input)
-            model="gpt-5-mini" if github_related else "gpt-5-nano"
-            print(f"user_input: {user_input} | github_related: {github_related} | selected_model: {model}")
-            dynamic_agent=Agent(
-                name="Main Agent",
-                instructions=main_agent.instructions,
-                handoffs=main_agent.handoffs,
-                model=model,
-                input_guardrails=main_agent.input_guardrails
-            )
-
+        outcome=await answer_turn(user_input,session,print_stream)
+        print()
+        if outcome.blocked:
+            print(f"❌({outcome.model}) Guardrail tripped unsafe input blocked")
+        elif outcome.error:
+            print(f"❌({outcome.model}) Run failed: {outcome.error}")
+        elif outcome.usage is not None:
+            history=session.last_window
+            print(f"Token Used:\n- Input Token: {outcome.usage.input_tokens}\n- Output Token: {outcome.usage.output_tokens}\n"
+                  f"- History: {history['sent_tokens']} of {history['history_tokens']} est. tokens sent "
+                  f"(saved {history['saved_tokens']})")
+
+# ---------------------------- query ------------------------------------------
+
+query_limiter=ClientLimiter()
+# /query runs get their own slots, so chat traffic can't hold up event handling (or the other way round).
+query_slots=asyncio.Semaphore(QUERY_MAX_CONCURRENT)
+
+async def query(request):
+    """POST {"question": ..., "session": ...}; streams the answer as Server-Sent Events.
+
+    The response's X-Client-Id header carries a signed client id; sending it
+    back continues that client's conversation history (one per session
+    name). Ids the server did not sign are replaced by a new one. The
+    per-client limit on concurrent queries is keyed by remote address.
+    """
+    meter=StreamMeter()
+    try:
+        body=codec.loads(await request.read() or b"{}")
+    except Exception as e:
+        QUERY_REQUESTS.inc(outcome="invalid")
+        return web.json_response({"error":f"undecodable body: {e}"},status=400)
+    if not isinstance(body,dict):
+        QUERY_REQUESTS.inc(outcome="invalid")
+        return web.json_response({"error":"body must be a JSON object"},status=400)
+    question=body.get("question")
+    question=question.strip() if isinstance(question,str) else ""
+    if not question:
+        QUERY_REQUESTS.inc(outcome="invalid")
+        return web.json_response({"error":"question is required"},status=400)
+    token=request.headers.get("X-Client-Id")
+    client=verify_client_id(token)
+    if client is None:
+        token=issue_client_id()
+        client=verify_client_id(token)
+    try:
+        with query_limiter.hold(request.remote or "unknown"):
+            response=web.StreamResponse(headers={"Content-Type":"text/event-stream","Cache-Control":"no-cache",
+                                                 "X-Accel-Buffering":"no","X-Client-Id":token})
+            await response.prepare(request)
+            # The run only queues frames; a separate writer sends them, so a slow client never holds a run slot.
+            frames:asyncio.Queue=asyncio.Queue()
+
+            async def emit(kind:str,text:str):
+                if kind=="delta":
+                    meter.delta()
+                frames.put_nowait(sse_event(kind,text))
+
+            async def write_frames():
+                while (frame:=await frames.get()) is not None:
+                    await response.write(frame)
+                await response.write_eof()
+
+            session=sessions.interactive(f"{client}/{body.get('session') or 'default'}")
+            turn=asyncio.create_task(answer_turn(question,session,emit,slot=lambda: query_slots))
+            writer=asyncio.create_task(write_frames())
             try:
-                result=Runner.run_streamed(dynamic_agent,user_input,session=session)
-
-                print(f"🤖 Assistant({dynamic_agent.model}): ", end="",flush=True)
-                async for event in result.stream_events():
-                    if event.type=="raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
-                        print(event.data.delta,end="",flush=True)
-                        await asyncio.sleep(0.03)
-                print()
-                usage=result.context_wrapper.usage
-                input_token=usage.input_tokens
-                output_token=usage.output_tokens
-                print(f"Token Used:\n- Input Token: {input_token}\n- Output Token: {output_token}")
+                await asyncio.wait({turn,writer},return_when=asyncio.FIRST_COMPLETED)
+                if writer.done():
+                    # The writer only finishes early when the client went away.
+                    writer.result()
+                outcome=await turn
+                report=meter.finish(outcome.model or "unknown",outcome.usage.output_tokens if outcome.usage else None)
+                outcome_name="blocked" if outcome.blocked else "error" if outcome.error else "cached" if outcome.cached else "ok"
+                frames.put_nowait(sse_event("done",{"outcome":outcome_name,"model":outcome.model,"error":outcome.error,
+                                                    **report}))
+                frames.put_nowait(None)
+                await writer
+                QUERY_REQUESTS.inc(outcome=outcome_name)
+            except ConnectionResetError:
+                QUERY_REQUESTS.inc(outcome="disconnected")
+            finally:
+                turn.cancel()
+                writer.cancel()
+            return response
+    except TooManyRequests:
+        QUERY_REQUESTS.inc(outcome="rejected")
+        return web.json_response({"error":f"at most {query_limiter.max_per_client} concurrent queries per client"},
+                                 status=429,headers={"Retry-After":"1"})
+
+
+def add_routes(app:web.Application):
+    app.router.add_post("/notify",notify)
+    app.router.add_post("/query",query)
+    app.router.add_get("/metrics",metrics.metrics_handler)
 
-            except InputGuardrailTripwireTriggered:
-                print(f"❌({agent.model}) Guardrail tripped unsafe input blocked")
+async def stop_pipeline():
+    await scheduler.close()
+    await coalescer.close()
+    await slack_client.close()
+    sessions.close()
 
 async def start_web_server():
     app=web.Application()
-    app.router.add_post("/notify",notify)
+    add_routes(app)
     runner=web.AppRunner(app)
     await runner.setup()
     site=web.TCPSite(runner,"localhost",8001)
     await site.start()
-    print("✅ Main Agent listening on http://localhost:8001/notify")
+    scheduler.recover_spill()
+    print("✅ Main Agent listening on http://localhost:8001/notify (queries: POST /query)")
 
 async def main():
+    init_tracing()
     await start_web_server()
-    await asyncio.gather(repo_loop(main_agent,session))
+    try:
+        await asyncio.gather(repo_loop(main_agent,session))
+    finally:
+        await stop_pipeline()
 
 if __name__=="__main__":
     asyncio.run(main())
@@ -0,0 +1,165 @@
+"""In-process metrics exported in the Prometheus text format.
+
+Counters and histograms are plain dicts keyed by label values, updated from
+the event loop; rendering happens only when ``/metrics`` is scraped.
+Components that already keep a ``stats()`` dict are exported as gauges with
+``register_stats`` instead of being instrumented twice.
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Callable
+from aiohttp import web
+
+DEFAULT_BUCKETS=(0.005,0.01,0.025,0.05,0.1,0.25,0.5,1.0,2.5,5.0,10.0,30.0,60.0)
+CONTENT_TYPE="text/plain; version=0.0.4; charset=utf-8"
+
+_METRICS:dict[str,"_Metric"]={}
+_STATS:dict[str,Callable[[],dict]]={}
+
+
+def _labels(names:tuple[str,...],values:tuple)->str:
+    if not names:
+        return ""
+    pairs=",".join(f'{name}="{_escape(value)}"' for name,value in zip(names,values))
+    return "{"+pairs+"}"
+
+
+def _escape(value)->str:
+    return str(value).replace("\\","\\\\").replace("\n","\\n").replace('"','\\"')
+
+
+def _number(value:float)->str:
+    if value==float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value,float) else str(value)
+
+
+class _Metric:
+    kind="untyped"
+
+    def __init__(self,name:str,help:str,labelnames:tuple[str,...]=()):
+        if name in _METRICS:
+            raise ValueError(f"metric {name} already registered")
+        self.name=name
+        self.help=help
+        self.labelnames=tuple(labelnames)
+        _METRICS[name]=self
+
+    def _key(self,labels:dict)->tuple:
+        return tuple(str(labels.get(name,"")) for name in self.labelnames)
+
+    def render(self)->list[str]:
+        return [f"# HELP {self.name} {self.help}",f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind="counter"
+
+    def __init__(self,name:str,help:str,labelnames:tuple[str,...]=()):
+        super().__init__(name,help,labelnames)
+        self._values:dict[tuple,float]={}
+
+    def inc(self,amount:float=1,**labels):
+        key=self._key(labels)
+        self._values[key]=self._values.get(key,0)+amount
+
+    def render(self)->list[str]:
+        lines=super().render()
+        for key,value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames,key)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind="histogram"
+
+    def __init__(self,name:str,help:str,labelnames:tuple[str,...]=(),buckets:tuple[float,...]=DEFAULT_BUCKETS):
+        super().__init__(name,help,labelnames)
+        self.buckets=tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._values:dict[tuple,list]={}
+
+    def observe(self,value:float,**labels):
+        key=self._key(labels)
+        entry=self._values.get(key)
+        if entry is None:
+            entry=self._values[key]=[[0]*(len(self.buckets)+1),0.0,0]
+        entry[0][bisect.bisect_left(self.buckets,value)]+=1
+        entry[1]+=value
+        entry[2]+=1
+
+    @contextmanager
+    def time(self,**labels):
+        start=time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter()-start,**labels)
+
+    def render(self)->list[str]:
+        lines=super().render()
+        names=self.labelnames+("le",)
+        for key,(counts,total,count) in sorted(self._values.items()):
+            cumulative=0
+            for bound,n in zip(self.buckets+(float("inf"),),counts):
+                cumulative+=n
+                lines.append(f"{self.name}_bucket{_labels(names,key+(_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames,key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames,key)} {count}")
+        return lines
+
+
+def register_stats(prefix:str,stats:Callable[[],dict]):
+    """Export the numeric entries of ``stats()`` as ``<prefix>_<key>`` gauges.
+
+    Nested dicts (e.g. status code counts) become one gauge labelled by key.
+    """
+    _STATS[prefix]=stats
+
+
+def _render_stats(prefix:str,stats:dict)->list[str]:
+    lines=[]
+    for key,value in stats.items():
+        name=f"{prefix}_{key}"
+        if isinstance(value,bool) or not isinstance(value,(int,float,dict)):
+            continue
+        lines.append(f"# TYPE {name} gauge")
+        if isinstance(value,dict):
+            for label,n in sorted(value.items(),key=lambda item: str(item[0])):
+                lines.append(f'{name}{{key="{_escape(label)}"}} {_number(n)}')
+        else:
+            lines.append(f"{name} {_number(value)}")
+    return lines
+
+
+def render()->str:
+    lines=[]
+    for metric in _METRICS.values():
+        lines.extend(metric.render())
+    for prefix,stats in _STATS.items():
+        try:
+            lines.extend(_render_stats(prefix,stats()))
+        except Exception as e:
+            print(f"⚠️ Failed to collect {prefix} stats: {e}")
+    return "\n".join(lines)+"\n"
+
+
+async def metrics_handler(request):
+    return web.Response(body=render().encode(),headers={"Content-Type":CONTENT_TYPE})
+
+
+# ---------------------------Pipeline metrics-----------------------------------
+
+INGEST_SECONDS=Histogram("ingest_seconds","Time to accept an event, by endpoint and event type",("endpoint","event_type"))
+INGEST_EVENTS=Counter("ingest_events_total","Events received, by endpoint, event type and outcome",
+                      ("endpoint","event_type","outcome"))
+STORE_WRITE_SECONDS=Histogram("event_store_write_seconds","EventStore.append latency",("endpoint",),
+                              buckets=(0.0005,0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,1.0))
+SLACK_POST_SECONDS=Histogram("slack_post_seconds","Slack webhook request latency, per attempt")
+SLACK_POST_STATUS=Counter("slack_post_status_total","Slack webhook responses by status code (error for transport failures)",
+                          ("status",))
+AGENT_RUN_SECONDS=Histogram("agent_run_seconds","Agent run latency",("agent",))
+GUARDRAIL_SECONDS=Histogram("guardrail_seconds","Input guardrail latency",("guardrail","triggered"))
+TOOL_CALL_SECONDS=Histogram("tool_call_seconds","Function tool call latency",("tool",))
+MODEL_TOKENS=Counter("model_tokens_total","Model tokens used, by agent, model and direction",("agent","model","direction"))
@@ -0,0 +1,114 @@
+import os
+import re
+from typing import Optional
+from cache import TTLCache
+from router import is_github_related
+
+RESPONSE_CACHE_ENABLED=os.environ.get("RESPONSE_CACHE_ENABLED","1")!="0"
+RESPONSE_CACHE_SIZE=int(os.environ.get("RESPONSE_CACHE_SIZE","256"))
+RESPONSE_CACHE_TTL=float(os.environ.get("RESPONSE_CACHE_TTL","900"))
+# Prefix a question with this to skip the cache for that turn.
+BYPASS_PREFIX="/fresh"
+
+# Anything that asks for an action rather than a report is never served from cache.
+_SIDE_EFFECTS=re.compile(r"\b(?:send|post|notify|slack|merge|close|open|create|delete|forward|remind)\b")
+_OPEN_PRS=re.compile(r"\b(?:open|pending)\s+(?:prs?|pull[ _-]?requests?)\b")
+# Answers relative to "now" go stale without any new event arriving.
+_RELATIVE_TIME=re.compile(r"\b(?:now|today|tonight|yesterday|ago|hours?|minutes?|this\s+(?:week|month|morning))\b")
+# Words that refer back to the conversation ("what about the other repo?"): the answer depends on the session.
+_CONTEXTUAL=re.compile(r"\b(?:it|its|that|this|these|those|they|them|their|there|other|same|previous|above|again|"
+                       r"else|instead|(?:what|how)\s+about|the\s+(?:repo|repository|project|pr|pull\s+request|"
+                       r"issue|branch))\b")
+_TOKEN=re.compile(r"[\w/#.-]+")
+# (intent, pattern), first match wins. Only specific wording: generic words like
+# "summary" or "what happened" say nothing about which report is wanted.
+INTENTS=[
+    ("latest_event",re.compile(r"\b(?:latest|last|most recent|newest)\s+(?:github\s+)?(?:event|activity|update)\b")),
+    ("recent_events",re.compile(r"\b(?:events?|activity)\b")),
+    ("open_prs",_OPEN_PRS),
+    ("repository_status",re.compile(r"\b(?:status|overview|stats|health)\b")),
+]
+
+
+def normalize(query:str)->str:
+    """Lowercased words of ``query`` without punctuation, so "Repo status?" and "repo  status" match."""
+    return " ".join(token.strip(".-") for token in _TOKEN.findall(query.lower()) if token.strip(".-"))
+
+
+def intent_key(query:str)->Optional[tuple]:
+    """(intent, normalized question) for read-only, context-free GitHub questions, None otherwise.
+
+    The whole normalized question is part of the key, so every filter it
+    names (repository, event type, sender, PR or issue number, count) keeps
+    its answer apart from the others. The key holds nothing about the
+    session, so answers are shared by every client: questions that refer
+    back to the conversation ("what about the other repo?") are never
+    cached.
+    """
+    if not is_github_related(query):
+        return None
+    text=query.lower()
+    for intent,pattern in INTENTS:
+        if pattern.search(text):
+            break
+    else:
+        return None
+    # "open PRs" is a question, not an action.
+    if _SIDE_EFFECTS.search(_OPEN_PRS.sub(" ",text)) or _RELATIVE_TIME.search(text) or _CONTEXTUAL.search(text):
+        return None
+    return (intent,normalize(query))
+
+
+def split_bypass(query:str)->tuple[str,bool]:
+    """Strip the bypass prefix; returns the query and whether the cache should be skipped."""
+    stripped=query.lstrip()
+    if stripped.lower().startswith(BYPASS_PREFIX):
+        return stripped[len(BYPASS_PREFIX):].lstrip(),True
+    return query,False
+
+
+class ResponseCache:
+    """Final answers to read-only GitHub questions, keyed by question and event-store version.
+
+    A new event bumps the store version, so answers computed before it are
+    never served again; they simply age out of the LRU.
+    """
+
+    def __init__(self,maxsize:int=RESPONSE_CACHE_SIZE,ttl:float=RESPONSE_CACHE_TTL,enabled:bool=RESPONSE_CACHE_ENABLED):
+        self.enabled=enabled
+        self._entries=TTLCache(maxsize=maxsize,ttl=ttl)
+        self.bypassed=0
+        self.uncacheable=0
+        self.invalidations=0
+
+    def key(self,query:str,version:int,bypass:bool=False)->Optional[tuple]:
+        """Cache key for ``query`` at store ``version``, or None if it must go to the model."""
+        if not self.enabled or bypass:
+            self.bypassed+=1
+            return None
+        intent=intent_key(query)
+        if intent is None:
+            self.uncacheable+=1
+            return None
+        return intent+(version,)
+
+    def get(self,key:Optional[tuple])->Optional[str]:
+        return None if key is None else self._entries.get(key)
+
+    def set(self,key:Optional[tuple],response:str):
+        if key is not None and response:
+            self._entries.set(key,response)
+
+    def invalidate(self):
+        """Drop every answer, e.g. when an event is ingested."""
+        if len(self._entries):
+            self.invalidations+=1
+            self._entries.invalidate()
+
+    def stats(self)->dict:
+        return {
+            **self._entries.stats(),
+            "bypassed":self.bypassed,
+            "uncacheable":self.uncacheable,
+            "invalidations":self.invalidations,
+        }
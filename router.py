@@ -0,0 +1,108 @@
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+import metrics
+
+ROUTER_POLICY=os.environ.get("ROUTER_POLICY","balanced").lower()
+
+TIER_MODELS={"nano":"gpt-5-nano","mini":"gpt-5-mini"}
+
+# Whole words only, so "price" is not a PR and "recreate" is not a create event.
+# Matched against the lowercased query; that is cheaper than re.IGNORECASE.
+GITHUB_PATTERN=re.compile(
+    r"\b(?:github|repo(?:s|sitor(?:y|ies))?|pull[ _-]?requests?|prs?|push(?:e[sd])?|"
+    r"issues?|events?|commits?|branch(?:es)?|create[ds]?|delete[ds]?)\b")
+
+
+def is_github_related(query:str)->bool:
+    """Detect if the user input is related to GitHub."""
+    return GITHUB_PATTERN.search(query.lower()) is not None
+
+
+@dataclass(frozen=True)
+class RoutingPolicy:
+    github_tier:str
+    other_tier:str
+    # Retry a failed run one tier up.
+    escalate:bool
+
+
+POLICIES={
+    # GitHub questions need tool use and handoffs, everything else gets the cheap tier.
+    "balanced":RoutingPolicy(github_tier="mini",other_tier="nano",escalate=True),
+    # Try the cheap tier first and pay for mini only when nano fails.
+    "cost":RoutingPolicy(github_tier="nano",other_tier="nano",escalate=True),
+    # Fastest model for everything; a retry would cost more time than it saves.
+    "latency":RoutingPolicy(github_tier="nano",other_tier="nano",escalate=False),
+}
+
+ROUTER_DECISIONS=metrics.Counter("router_decisions_total","Routing decisions by tier and classification",
+                                 ("tier","github_related"))
+ROUTER_ESCALATIONS=metrics.Counter("router_escalations_total","Runs retried on a higher tier",("from_tier","to_tier"))
+ROUTER_SECONDS=metrics.Histogram("router_decision_seconds","Time spent classifying and routing a turn",
+                                 buckets=(0.00001,0.00005,0.0001,0.0005,0.001,0.005))
+
+
+@dataclass
+class RouteDecision:
+    github_related:bool
+    tier:str
+    model:str
+    policy:str
+    latency:float
+    escalated_from:Optional[str]=None
+
+
+class ModelRouter:
+    """Picks a model tier per turn and hands out agents built once per tier.
+
+    Each tier's agent is a clone of ``base_agent`` with only the model
+    swapped, so instructions, handoffs and guardrails stay shared.
+    """
+
+    def __init__(self,base_agent,policy:str=ROUTER_POLICY,tiers:dict[str,str]=TIER_MODELS):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown routing policy {policy!r}, expected one of {', '.join(POLICIES)}")
+        self.policy_name=policy
+        self.policy=POLICIES[policy]
+        self.tiers=list(tiers)
+        self.agents={tier:base_agent.clone(model=model) for tier,model in tiers.items()}
+        self.decisions={tier:0 for tier in tiers}
+        self.escalations=0
+        self.latency_total=0.0
+
+    def route(self,query:str)->RouteDecision:
+        start=time.perf_counter()
+        github_related=is_github_related(query)
+        tier=self.policy.github_tier if github_related else self.policy.other_tier
+        latency=time.perf_counter()-start
+        self.decisions[tier]+=1
+        self.latency_total+=latency
+        ROUTER_DECISIONS.inc(tier=tier,github_related=str(github_related).lower())
+        ROUTER_SECONDS.observe(latency)
+        return RouteDecision(github_related=github_related,tier=tier,model=self.agents[tier].model,
+                             policy=self.policy_name,latency=latency)
+
+    def agent(self,decision:RouteDecision):
+        return self.agents[decision.tier]
+
+    def escalate(self,decision:RouteDecision)->Optional[RouteDecision]:
+        """The decision for retrying one tier up, or None if the policy or tiers don't allow it."""
+        index=self.tiers.index(decision.tier)
+        if not self.policy.escalate or index+1>=len(self.tiers):
+            return None
+        tier=self.tiers[index+1]
+        self.escalations+=1
+        ROUTER_ESCALATIONS.inc(from_tier=decision.tier,to_tier=tier)
+        return RouteDecision(github_related=decision.github_related,tier=tier,model=self.agents[tier].model,
+                             policy=self.policy_name,latency=decision.latency,escalated_from=decision.tier)
+
+    def stats(self)->dict:
+        total=sum(self.decisions.values())
+        return {
+            "decisions":dict(self.decisions),
+            "escalations":self.escalations,
+            "latency_avg":self.latency_total/total if total else 0.0,
+        }
@@ -0,0 +1,211 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+import codec
+from extractors import repository_name
+
+SCHEDULER_CONCURRENCY=int(os.environ.get("SCHEDULER_CONCURRENCY","4"))
+SCHEDULER_MAX_QUEUE=int(os.environ.get("SCHEDULER_MAX_QUEUE","500"))
+# Events over the queue limit are spilled here; set SCHEDULER_SPILL_FILE="" to shed them instead.
+SCHEDULER_SPILL_FILE=os.environ.get("SCHEDULER_SPILL_FILE",str(Path(__file__).parent / "scheduler_spill.jsonl"))
+
+PRIORITY_INTERACTIVE=0
+PRIORITY_PR_STATE=1
+PRIORITY_PR=2
+PRIORITY_DEFAULT=3
+PRIORITY_PUSH=4
+
+
+def event_priority(event_type:str,data:dict)->int:
+    if event_type=="pull_request":
+        return PRIORITY_PR_STATE if data.get("action") in ("opened","closed","reopened") else PRIORITY_PR
+    if event_type=="push":
+        return PRIORITY_PUSH
+    return PRIORITY_DEFAULT
+
+
+class _Job:
+    __slots__=("event_type","data","priority","enqueued_at")
+
+    def __init__(self,event_type:str,data:dict,priority:int):
+        self.event_type=event_type
+        self.data=data
+        self.priority=priority
+        self.enqueued_at=time.monotonic()
+
+
+class EventScheduler:
+    """Bounded, prioritized runner for background event handling.
+
+    At most ``concurrency`` jobs (events and interactive turns) run at once;
+    free slots go to the highest-priority waiter. Events for one repository
+    run one at a time in arrival order. Once ``max_queue`` events are
+    waiting, new events are spilled to ``spill_file`` and replayed when the
+    backlog halves, or shed if no spill file is configured.
+    """
+
+    def __init__(self,handler:Callable[[str,dict],Awaitable],concurrency:int=SCHEDULER_CONCURRENCY,
+                 max_queue:int=SCHEDULER_MAX_QUEUE,spill_file:Optional[str]=SCHEDULER_SPILL_FILE,
+                 priority:Callable[[str,dict],int]=event_priority):
+        self.handler=handler
+        self.concurrency=concurrency
+        self.max_queue=max_queue
+        self.spill_file=Path(spill_file) if spill_file else None
+        self.priority=priority
+        self._running=0
+        self._waiters:list[tuple[int,int,asyncio.Future]]=[]
+        self._seq=itertools.count()
+        self._repo_queues:dict[Optional[str],deque[_Job]]={}
+        self._repo_tasks:dict[Optional[str],asyncio.Task]={}
+        self._pending=0
+        self._spilled=0
+        self.completed=0
+        self.failed=0
+        self.shed=0
+        self.spilled_total=0
+        self.wait_total=0.0
+        self.wait_max=0.0
+        self.waits=0
+
+    # ----------------------------Slots------------------------------------------
+
+    async def acquire(self,priority:int):
+        if self._running<self.concurrency and not self._waiters:
+            self._running+=1
+            return
+        future=asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters,(priority,next(self._seq),future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        self._running-=1
+        while self._waiters:
+            _,_,future=heapq.heappop(self._waiters)
+            if not future.done():
+                self._running+=1
+                future.set_result(None)
+                break
+
+    @asynccontextmanager
+    async def slot(self,priority:int=PRIORITY_INTERACTIVE):
+        """Hold one concurrency slot, e.g. for an interactive agent turn."""
+        start=time.monotonic()
+        await self.acquire(priority)
+        self._record_wait(time.monotonic()-start)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _record_wait(self,wait:float):
+        self.waits+=1
+        self.wait_total+=wait
+        self.wait_max=max(self.wait_max,wait)
+
+    # ----------------------------Events-----------------------------------------
+
+    def submit_event(self,event_type:str,data:dict):
+        if self._spilled or self._pending>=self.max_queue:
+            self._overflow(event_type,data)
+            return
+        self._enqueue(_Job(event_type,data,self.priority(event_type,data)))
+
+    def _enqueue(self,job:_Job):
+        repository=repository_name(job.data)
+        self._repo_queues.setdefault(repository,deque()).append(job)
+        self._pending+=1
+        if repository not in self._repo_tasks:
+            self._repo_tasks[repository]=asyncio.create_task(self._drain_repository(repository))
+
+    async def _drain_repository(self,repository:Optional[str]):
+        queue=self._repo_queues[repository]
+        try:
+            while queue:
+                job=queue[0]
+                await self.acquire(job.priority)
+                queue.popleft()
+                self._pending-=1
+                self._record_wait(time.monotonic()-job.enqueued_at)
+                try:
+                    await self.handler(job.event_type,job.data)
+                    self.completed+=1
+                except Exception as e:
+                    self.failed+=1
+                    print(f"❌ Event handler failed for {job.event_type} on {repository}: {e}")
+                finally:
+                    self.release()
+                if self._spilled and self._pending<=self.max_queue//2:
+                    self._replay_spill()
+        finally:
+            del self._repo_tasks[repository]
+            if not queue:
+                del self._repo_queues[repository]
+
+    def _overflow(self,event_type:str,data:dict):
+        if self.spill_file is None:
+            self.shed+=1
+            print(f"⚠️ Event queue full, shedding {event_type} event")
+            return
+        with open(self.spill_file,"a") as f:
+            f.write(codec.dumps_str({"event_type":event_type,"data":data})+"\n")
+        self._spilled+=1
+        self.spilled_total+=1
+
+    def _replay_spill(self):
+        lines=self._take_spill()
+        room=max(0,self.max_queue-self._pending)
+        replay,remainder=lines[:room],lines[room:]
+        if remainder:
+            with open(self.spill_file,"w") as f:
+                f.writelines(remainder)
+        self._spilled=len(remainder)
+        for line in replay:
+            job=codec.loads(line)
+            self._enqueue(_Job(job["event_type"],job["data"],self.priority(job["event_type"],job["data"])))
+
+    def _take_spill(self)->list[str]:
+        if not self.spill_file.exists():
+            return []
+        with open(self.spill_file) as f:
+            lines=[line for line in f if line.strip()]
+        self.spill_file.unlink()
+        return lines
+
+    def recover_spill(self):
+        """Re-submit events spilled by a previous run."""
+        if self.spill_file is not None and self.spill_file.exists():
+            for line in self._take_spill():
+                job=codec.loads(line)
+                self.submit_event(job["event_type"],job["data"])
+
+    async def close(self,timeout:float=10.0):
+        tasks=list(self._repo_tasks.values())
+        if tasks:
+            done,pending=await asyncio.wait(tasks,timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+    def stats(self)->dict:
+        return {
+            "running":self._running,
+            "queue_depth":self._pending,
+            "waiting_slots":len(self._waiters),
+            "spilled":self._spilled,
+            "completed":self.completed,
+            "failed":self.failed,
+            "shed":self.shed,
+            "spilled_total":self.spilled_total,
+            "wait_avg":self.wait_total/self.waits if self.waits else 0.0,
+            "wait_max":self.wait_max,
+        }
@@ -0,0 +1,212 @@
+"""Run the webhook receiver and the agent pipeline together.
+
+    python server.py                 # one process: webhook -> event bus -> pipeline, plus the chat loop
+    python server.py --workers 4     # webhook process + 4 pipeline workers sharded by repository
+
+Both modes store each event once, in the webhook handler, and skip the HTTP
+hop to /notify. With ``--workers``, the front process still serves the Main
+Agent's routes (``/notify``, ``POST /query``) and the chat loop, but hands
+events to the workers; ``/metrics`` of worker ``i`` is served on
+``--metrics-port + i``.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
+from aiohttp import web
+from pathlib import Path
+import codec
+import metrics
+import webhook_server
+from bus import EventBus, ShardedBus
+
+SERVER_HOST=os.environ.get("SERVER_HOST","localhost")
+SERVER_PORT=int(os.environ.get("SERVER_PORT","8080"))
+INGEST_WORKERS=int(os.environ.get("INGEST_WORKERS","0"))
+WORKER_QUEUE_SIZE=int(os.environ.get("WORKER_QUEUE_SIZE","1000"))
+WORKER_METRICS_PORT=int(os.environ.get("WORKER_METRICS_PORT","9101"))
+WORKER_CHECK_INTERVAL=float(os.environ.get("WORKER_CHECK_INTERVAL","1"))
+
+
+def _webhook_app(sink)->web.Application:
+    """The webhook route publishing to ``sink`` instead of the HTTP forwarder."""
+    app=web.Application()
+    app[webhook_server.FORWARDER]=sink
+    metrics.register_stats("forwarder",sink.stats)
+    app.router.add_post("/webhook/github",webhook_server.handle_webhook)
+    app.on_startup.append(webhook_server.start_forwarder)
+    app.on_cleanup.append(webhook_server.stop_forwarder)
+    return app
+
+
+# ---------------------------Single process-------------------------------------
+
+async def run_single(host:str,port:int,interactive:bool):
+    import main_agent
+    from tracing import init_tracing
+
+    init_tracing()
+    bus=EventBus()
+    bus.subscribe(main_agent.accept_event)
+    app=_webhook_app(bus)
+    main_agent.add_routes(app)
+    runner=web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner,host,port).start()
+    main_agent.scheduler.recover_spill()
+    print(f"✅ Webhook server and Main Agent listening on http://{host}:{port} (single process)")
+    try:
+        if interactive:
+            await main_agent.repo_loop(main_agent.main_agent,main_agent.session)
+        else:
+            await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await main_agent.stop_pipeline()
+
+
+# ---------------------------Sharded workers------------------------------------
+
+async def _worker(index:int,events:multiprocessing.Queue,metrics_port:int):
+    import main_agent
+    from tracing import init_tracing
+
+    init_tracing()
+    app=web.Application()
+    app.router.add_get("/metrics",metrics.metrics_handler)
+    runner=web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner,"localhost",metrics_port).start()
+    main_agent.scheduler.recover_spill()
+    print(f"✅ Worker {index} running (metrics on http://localhost:{metrics_port}/metrics)")
+    try:
+        while True:
+            payload=await asyncio.to_thread(events.get)
+            if payload is None:
+                break
+            main_agent.accept_event(codec.loads(payload))
+    finally:
+        await main_agent.stop_pipeline()
+        await runner.cleanup()
+
+
+def worker_main(index:int,events:multiprocessing.Queue,metrics_port:int):
+    # Each worker keeps its own scheduler spill file so replays stay on their shard.
+    spill_file=os.environ.get("SCHEDULER_SPILL_FILE",str(Path(__file__).parent / "scheduler_spill.jsonl"))
+    if spill_file:
+        os.environ["SCHEDULER_SPILL_FILE"]=f"{spill_file}.{index}"
+    try:
+        asyncio.run(_worker(index,events,metrics_port))
+    except KeyboardInterrupt:
+        pass
+
+
+class WorkerPool:
+    """The sharded pipeline workers, restarted if they die.
+
+    A restarted worker gets a fresh queue (the dead one may have died
+    holding the old queue's lock); whatever the old queue still holds is
+    moved over, and its own spill file is replayed on startup.
+    """
+
+    def __init__(self,workers:int,metrics_port:int,queue_size:int=WORKER_QUEUE_SIZE):
+        self.context=multiprocessing.get_context("spawn")
+        self.metrics_port=metrics_port
+        self.queue_size=queue_size
+        self.queues=[self.context.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.processes=[self._spawn(i) for i in range(workers)]
+        self.restarts=0
+
+    def _spawn(self,index:int)->multiprocessing.Process:
+        process=self.context.Process(target=worker_main,args=(index,self.queues[index],self.metrics_port+index),
+                                     name=f"event-worker-{index}")
+        process.start()
+        return process
+
+    def ensure(self,index:int):
+        """Restart worker ``index`` if it is no longer running."""
+        process=self.processes[index]
+        if process.is_alive():
+            return
+        print(f"⚠️ Worker {index} exited with code {process.exitcode}, restarting")
+        old,new=self.queues[index],self.context.Queue(maxsize=self.queue_size)
+        while True:
+            try:
+                new.put_nowait(old.get_nowait())
+            except (queue.Empty,queue.Full):
+                break
+        old.cancel_join_thread()
+        self.queues[index]=new
+        self.processes[index]=self._spawn(index)
+        self.restarts+=1
+
+    async def monitor(self,interval:float=WORKER_CHECK_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            for index in range(len(self.processes)):
+                self.ensure(index)
+
+    async def join(self,timeout:float=30):
+        for process in self.processes:
+            await asyncio.to_thread(process.join,timeout)
+
+    def stats(self)->dict:
+        return {"workers":len(self.processes),"alive":sum(p.is_alive() for p in self.processes),
+                "restarts":self.restarts}
+
+
+async def run_sharded(host:str,port:int,workers:int,metrics_port:int,interactive:bool):
+    import main_agent
+    from tracing import init_tracing
+
+    # Queries and chat turns run here; only the event pipeline runs in the workers.
+    init_tracing()
+    pool=WorkerPool(workers,metrics_port)
+    metrics.register_stats("workers",pool.stats)
+    # The bus shares pool.queues, so it sees the queue of a restarted worker.
+    bus=ShardedBus(pool.queues,on_stall=pool.ensure)
+    app=_webhook_app(bus)
+    app[main_agent.EVENT_SINK]=bus
+    main_agent.add_routes(app)
+    runner=web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner,host,port).start()
+    print(f"✅ Webhook server and Main Agent listening on http://{host}:{port}, "
+          f"{workers} workers sharded by repository")
+    monitor=asyncio.create_task(pool.monitor())
+    try:
+        if interactive:
+            await main_agent.repo_loop(main_agent.main_agent,main_agent.session)
+        else:
+            await asyncio.Event().wait()
+    finally:
+        # Stop restarting workers before the bus tells them to exit.
+        monitor.cancel()
+        # Cleanup stops the sharded bus, which sends each worker its shutdown marker.
+        await runner.cleanup()
+        await pool.join()
+        await main_agent.stop_pipeline()
+
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host",default=SERVER_HOST)
+    parser.add_argument("--port",type=int,default=SERVER_PORT)
+    parser.add_argument("--workers",type=int,default=INGEST_WORKERS,
+                        help="pipeline worker processes, sharded by repository (0 runs everything in this process)")
+    parser.add_argument("--metrics-port",type=int,default=WORKER_METRICS_PORT,help="first worker's metrics port")
+    parser.add_argument("--no-chat",action="store_true",help="don't start the interactive chat loop")
+    args=parser.parse_args()
+    try:
+        if args.workers>0:
+            asyncio.run(run_sharded(args.host,args.port,args.workers,args.metrics_port,
+                                    interactive=not args.no_chat))
+        else:
+            asyncio.run(run_single(args.host,args.port,interactive=not args.no_chat))
+    except KeyboardInterrupt:
+        print("👋 Shutting down")
+
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,206 @@
+import os
+from collections import OrderedDict
+from typing import Optional
+from agents import SQLiteSession, TResponseInputItem
+import codec
+import metrics
+
+# ":memory:" keeps histories for the life of the process, a file path persists them.
+SESSION_DB=os.environ.get("SESSION_DB",":memory:")
+SESSION_MAX_TOKENS=int(os.environ.get("SESSION_MAX_TOKENS","4000"))
+SESSION_SUMMARY_TOKENS=int(os.environ.get("SESSION_SUMMARY_TOKENS","300"))
+# Stored items dropped from the window are folded into the summary once there are this many.
+SESSION_COMPACT_AFTER=int(os.environ.get("SESSION_COMPACT_AFTER","50"))
+SESSION_USER=os.environ.get("SESSION_USER","local")
+# Least recently used sessions beyond this are dropped; with a file SESSION_DB their history is reloaded on next use.
+SESSION_MAX_OPEN=int(os.environ.get("SESSION_MAX_OPEN","1000"))
+# "ephemeral": every event run starts from an empty history; "repository": one session per repository.
+SESSION_EVENT_MODE=os.environ.get("SESSION_EVENT_MODE","ephemeral").lower()
+
+SUMMARY_MARKER="[Summary of earlier conversation]"
+
+SESSION_TOKENS_SAVED=metrics.Counter("session_tokens_saved_total","Estimated history tokens not sent to the model",("source",))
+SESSION_TOKENS_SENT=metrics.Histogram("session_history_tokens","Estimated history tokens sent per turn",("source",),
+                                      buckets=(250,500,1000,2000,4000,8000,16000,32000))
+
+
+def estimate_tokens(item:TResponseInputItem)->int:
+    """Rough token count (~4 characters per token) of an input item as sent to the API."""
+    return len(codec.dumps_str(item))//4+1
+
+
+def _is_user_message(item:TResponseInputItem)->bool:
+    return isinstance(item,dict) and item.get("role")=="user" and item.get("type","message")=="message"
+
+
+def _text(item:TResponseInputItem)->str:
+    content=item.get("content","") if isinstance(item,dict) else ""
+    if isinstance(content,list):
+        content=" ".join(c.get("text","") for c in content if isinstance(c,dict))
+    return " ".join(str(content).split())
+
+
+def summarize(dropped:list[TResponseInputItem],max_tokens:int=SESSION_SUMMARY_TOKENS)->TResponseInputItem:
+    """Fold ``dropped`` turns into one message listing the most recent questions that fit.
+
+    Extractive on purpose: a model-written summary would spend tokens and
+    latency on every compaction.
+    """
+    budget=max_tokens*4
+    earlier=""
+    questions=[]
+    turns=0
+    for item in dropped:
+        text=_text(item)
+        if text.startswith(SUMMARY_MARKER):
+            earlier=text[len(SUMMARY_MARKER):].strip()
+        elif _is_user_message(item):
+            turns+=1
+            questions.append(text[:200])
+    header=f"{SUMMARY_MARKER} {turns} earlier turns were removed to save tokens."
+    lines=[]
+    used=len(header)
+    for question in reversed(questions):
+        if used+len(question)+4>budget:
+            break
+        lines.append(f'- "{question}"')
+        used+=len(question)+4
+    body=header
+    if lines:
+        body+=" The user had asked:\n"+"\n".join(reversed(lines))
+    if earlier and used<budget:
+        body+="\nBefore that: "+earlier[:budget-used]
+    return {"role":"system","content":body}
+
+
+class BudgetedSession(SQLiteSession):
+    """SQLiteSession whose history is cut to a token budget before each run.
+
+    Whole turns are dropped oldest first (the newest turn is always kept)
+    and replaced by one summary message. Once enough stored items are
+    outside the window, the stored history itself is rewritten to the
+    summary plus the window so it stops growing.
+    """
+
+    def __init__(self,session_id:str,source:str,db_path:str=SESSION_DB,max_tokens:int=SESSION_MAX_TOKENS,
+                 summary_tokens:int=SESSION_SUMMARY_TOKENS,compact_after:int=SESSION_COMPACT_AFTER):
+        super().__init__(session_id,db_path=db_path)
+        self.source=source
+        self.max_tokens=max_tokens
+        self.summary_tokens=summary_tokens
+        self.compact_after=compact_after
+        self.last_window={"history_tokens":0,"sent_tokens":0,"saved_tokens":0,"dropped_items":0}
+        self.turns=0
+        self.tokens_saved=0
+        self.compactions=0
+        # Items added through add_items since mark(), so a failed run can be rolled back.
+        self._added=0
+
+    async def add_items(self,items:list[TResponseInputItem])->None:
+        await super().add_items(items)
+        self._added+=len(items)
+
+    def mark(self):
+        """Start counting the items a run adds, for ``rollback``."""
+        self._added=0
+
+    async def rollback(self)->int:
+        """Remove the items added since ``mark()`` (e.g. a failed run's input); returns how many."""
+        removed=0
+        while self._added>0 and await self.pop_item() is not None:
+            self._added-=1
+            removed+=1
+        self._added=0
+        return removed
+
+    async def get_items(self,limit:Optional[int]=None)->list[TResponseInputItem]:
+        items=await super().get_items(limit)
+        if limit is not None:
+            return items
+        window,dropped=self.window(items)
+        if len(dropped)>=self.compact_after:
+            await self.clear_session()
+            await super().add_items(window)
+            self.compactions+=1
+        return window
+
+    def window(self,items:list[TResponseInputItem])->tuple[list[TResponseInputItem],list[TResponseInputItem]]:
+        """The items to send and the items left out, and record the per-turn savings."""
+        sizes=[estimate_tokens(item) for item in items]
+        history=sum(sizes)
+        cut=0
+        if history>self.max_tokens:
+            budget=self.max_tokens-self.summary_tokens
+            starts=[i for i,item in enumerate(items) if _is_user_message(item)]
+            cut=starts[-1] if starts else 0
+            suffix=sum(sizes[cut:])
+            for previous,start in zip(reversed(starts[:-1]),reversed(starts)):
+                turn=sum(sizes[previous:start])
+                if suffix+turn>budget:
+                    break
+                suffix+=turn
+                cut=previous
+        dropped=items[:cut]
+        window=([summarize(dropped,self.summary_tokens)] if dropped else [])+items[cut:]
+        sent=sum(sizes[cut:])+(estimate_tokens(window[0]) if dropped else 0)
+        self.turns+=1
+        self.tokens_saved+=max(0,history-sent)
+        self.last_window={"history_tokens":history,"sent_tokens":sent,"saved_tokens":max(0,history-sent),
+                          "dropped_items":len(dropped)}
+        SESSION_TOKENS_SENT.observe(sent,source=self.source)
+        if history>sent:
+            SESSION_TOKENS_SAVED.inc(history-sent,source=self.source)
+        return window,dropped
+
+
+class SessionManager:
+    """Hands out one history per conversation source.
+
+    Interactive users each get their own session; background event runs get
+    none (``ephemeral``) or one per repository (``repository``), so event
+    traffic never inflates the interactive history.
+    """
+
+    def __init__(self,db_path:str=SESSION_DB,max_tokens:int=SESSION_MAX_TOKENS,event_mode:str=SESSION_EVENT_MODE,
+                 max_open:int=SESSION_MAX_OPEN):
+        if event_mode not in ("ephemeral","repository"):
+            raise ValueError(f"unknown SESSION_EVENT_MODE {event_mode!r}, expected ephemeral or repository")
+        self.db_path=db_path
+        self.max_tokens=max_tokens
+        self.event_mode=event_mode
+        self.max_open=max_open
+        self._sessions:OrderedDict[str,BudgetedSession]=OrderedDict()
+
+    def _get(self,session_id:str,source:str)->BudgetedSession:
+        session=self._sessions.get(session_id)
+        if session is None:
+            session=self._sessions[session_id]=BudgetedSession(session_id,source,db_path=self.db_path,
+                                                               max_tokens=self.max_tokens)
+            # Not closed: a request may still be using it; it closes once garbage collected.
+            while len(self._sessions)>self.max_open:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def interactive(self,user:str=SESSION_USER)->BudgetedSession:
+        return self._get(f"user:{user}","interactive")
+
+    def for_event(self,repository:Optional[str])->Optional[BudgetedSession]:
+        if self.event_mode=="ephemeral":
+            return None
+        return self._get(f"repository:{repository or 'unknown'}","event")
+
+    def stats(self)->dict:
+        turns=sum(s.turns for s in self._sessions.values())
+        return {
+            "sessions":len(self._sessions),
+            "turns":turns,
+            "tokens_saved":sum(s.tokens_saved for s in self._sessions.values()),
+            "compactions":sum(s.compactions for s in self._sessions.values()),
+        }
+
+    def close(self):
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
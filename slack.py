@@ -1,5 +1,5 @@
 import asyncio
-from agents import (Agent,Runner,
+from agents import (Agent,
                     GuardrailFunctionOutput,
                     RunContextWrapper,TResponseInputItem,input_guardrail)
 from agents.tool import function_tool
@@ -8,13 +8,16 @@ from pydantic import BaseModel
 from pathlib import Path
 import json
 import os
-import requests
+from slack_client import SlackClient
+from guardrail_policy import check_input
 from dotenv import load_dotenv
 load_dotenv()
 
 SLACK_BOT_TOKEN=os.environ.get("SLACK_API_KEY")
 SLACK_WEBHOOK_URL=os.environ.get("SLACK_WEBHOOK_URL")
 SLACK_CHANNEL_ID=os.environ.get("SLACK_Channel_ID")
+
+slack_client=SlackClient()
 # --------------------------Guardrail-------------------------------------------------
 
 class SlackSecurityCheckup(BaseModel):
@@ -34,18 +37,29 @@ async def slack_guardrail(
     ctx:RunContextWrapper[None],
     agent:Agent,
     input:str|list[TResponseInputItem])->GuardrailFunctionOutput:
-    result= await Runner.run(guardrail_agent,input,context=ctx.context)
-    return GuardrailFunctionOutput(output_info=result.final_output, tripwire_triggered=result.final_output.is_unsafe)
+    return await check_input(guardrail_agent,ctx,input)
+
+
+def render_blocks(message:str)->list[dict]:
+    return [
+        {"type":"section","text":{"type":"mrkdwn","text":message}}]
+
+
+async def post_slack_message(message:str,channel:Optional[str]=None)->str:
+    """Post ``message`` to the Slack webhook and return a human-readable status."""
+    channel=channel if channel else SLACK_CHANNEL_ID
+    payload={
+            "channel":channel,
+            "blocks":render_blocks(message),
+            "text":message,
+            "mrkdwn":True
+        }
+    return await slack_client.post(payload,channel)
 
 
 @function_tool
-def send_slack_notification(message:str,repo:str,channel:str,pr_number:int=None,event_type:str="unknown")->str:
+async def send_slack_notification(message:str,repo:str,channel:str,pr_number:int=None,event_type:str="unknown")->str:
     """Send a formatted notification to the team slack channel."""
-    webhook_url=os.environ.get("SLACK_WEBHOOK_URL")
-    if not webhook_url:
-        return "Error: SLACK_WEBHOOK_URL environment  variable not set"
-    blocks=[
-        {"type":"section","text":{"type":"mrkdwn","text":message}}]
     # if event_type and event_type.lower()=="pull_request" and  pr_number and str(pr_number).isdigit():
         
     #     value_payload = json.dumps({"repo": repo, "pr_number": pr_number})
@@ -70,25 +84,7 @@ def send_slack_notification(message:str,repo:str,channel:str,pr_number:int=None,
         #     ]
         # }
         # )
-
-    payload={
-            "channel":channel if channel else SLACK_CHANNEL_ID,
-            "blocks":blocks,
-            "text":message,
-            "mrkdwn":True
-        }
-    try:
-        response=requests.post(webhook_url,json=payload,timeout=10)
-        if response.status_code==200:
-            return "✅ Message sent successfully to slack."
-        else:
-            return f"❌ Failed to send message. Status: {response.status_code}, Response: {response.text}"
-    except requests.exceptions.Timeout:
-        return "❌ Request timed out. Check your internet connection and try again."
-    except requests.exceptions.ConnectionError:
-        return "❌ Connection error. Check your  internet connection and webhook URL."
-    except Exception as e:
-        return f"❌ Error sending message: {str(e)}"
+    return await post_slack_message(message,channel)
 
 
 slack_agent=Agent(
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import random
+import time
+from collections import Counter
+from typing import Optional
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, ClientError
+import metrics
+
+SLACK_MAX_RETRIES=int(os.environ.get("SLACK_MAX_RETRIES","4"))
+SLACK_TIMEOUT=float(os.environ.get("SLACK_TIMEOUT","10"))
+
+
+class SlackClient:
+    """Async Slack webhook transport.
+
+    Keeps one pooled keep-alive session, retries transient failures with
+    jittered exponential backoff, honours Slack's 429 ``Retry-After`` and
+    serializes posts per channel so messages arrive in the order they were sent.
+    """
+
+    def __init__(self,webhook_url:Optional[str]=None,max_retries:int=SLACK_MAX_RETRIES,timeout:float=SLACK_TIMEOUT,
+                 backoff_base:float=0.5,backoff_max:float=30.0,pool_size:int=16):
+        self.webhook_url=webhook_url
+        self.max_retries=max_retries
+        self.timeout=timeout
+        self.backoff_base=backoff_base
+        self.backoff_max=backoff_max
+        self.pool_size=pool_size
+        self._session:Optional[ClientSession]=None
+        self._channel_locks:dict[str,asyncio.Lock]={}
+        self.requests=0
+        self.retries=0
+        self.errors=0
+        self.rate_limited=0
+        self.status_codes:Counter[int]=Counter()
+        self.latency_total=0.0
+        self.latency_max=0.0
+
+    def _get_session(self)->ClientSession:
+        if self._session is None or self._session.closed:
+            self._session=ClientSession(
+                connector=TCPConnector(limit=self.pool_size,keepalive_timeout=60),
+                timeout=ClientTimeout(total=self.timeout))
+        return self._session
+
+    def _backoff(self,attempt:int)->float:
+        return random.uniform(0,min(self.backoff_max,self.backoff_base*2**attempt))
+
+    async def post(self,payload:dict,channel:Optional[str]=None)->str:
+        """Post ``payload`` to the webhook and return a human-readable status."""
+        webhook_url=self.webhook_url or os.environ.get("SLACK_WEBHOOK_URL")
+        if not webhook_url:
+            return "Error: SLACK_WEBHOOK_URL environment  variable not set"
+        lock=self._channel_locks.setdefault(channel or "",asyncio.Lock())
+        async with lock:
+            return await self._post_with_retries(webhook_url,payload)
+
+    async def _post_with_retries(self,webhook_url:str,payload:dict)->str:
+        status="❌ Error sending message: no attempt made"
+        for attempt in range(self.max_retries+1):
+            if attempt:
+                self.retries+=1
+            delay=None
+            start=time.perf_counter()
+            try:
+                async with self._get_session().post(webhook_url,json=payload) as response:
+                    body=await response.text()
+                    self._record(response.status,time.perf_counter()-start)
+                    if response.status==200:
+                        return "✅ Message sent successfully to slack."
+                    status=f"❌ Failed to send message. Status: {response.status}, Response: {body}"
+                    if response.status==429:
+                        self.rate_limited+=1
+                        retry_after=response.headers.get("Retry-After","")
+                        delay=float(retry_after) if retry_after.isdigit() else None
+                    elif response.status<500:
+                        return status
+            except asyncio.TimeoutError:
+                self._record(None,time.perf_counter()-start)
+                status="❌ Request timed out. Check your internet connection and try again."
+            except ClientError as e:
+                self._record(None,time.perf_counter()-start)
+                status=f"❌ Connection error. Check your  internet connection and webhook URL. ({e})"
+            if attempt<self.max_retries:
+                await asyncio.sleep(self._backoff(attempt) if delay is None else delay)
+        return status
+
+    def _record(self,status:Optional[int],latency:float):
+        self.requests+=1
+        self.latency_total+=latency
+        self.latency_max=max(self.latency_max,latency)
+        metrics.SLACK_POST_SECONDS.observe(latency)
+        metrics.SLACK_POST_STATUS.inc(status="error" if status is None else status)
+        if status is None:
+            self.errors+=1
+        else:
+            self.status_codes[status]+=1
+            if status!=200:
+                self.errors+=1
+
+    def stats(self)->dict:
+        return {
+            "requests":self.requests,
+            "retries":self.retries,
+            "errors":self.errors,
+            "rate_limited":self.rate_limited,
+            "status_codes":dict(self.status_codes),
+            "latency_avg":self.latency_total/self.requests if self.requests else 0.0,
+            "latency_max":self.latency_max,
+        }
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session=None
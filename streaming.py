@@ -0,0 +1,106 @@
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from typing import Optional
+import codec
+import metrics
+
+QUERY_MAX_PER_CLIENT=int(os.environ.get("QUERY_MAX_PER_CLIENT","2"))
+# Model runs for /query in flight at once, separate from the event pipeline's scheduler slots.
+QUERY_MAX_CONCURRENT=int(os.environ.get("QUERY_MAX_CONCURRENT","16"))
+# Signs the client ids handed out by /query; set it to keep ids valid across restarts.
+QUERY_CLIENT_SECRET=os.environ.get("QUERY_CLIENT_SECRET") or secrets.token_hex(32)
+
+QUERY_REQUESTS=metrics.Counter("query_requests_total","/query requests by outcome",("outcome",))
+QUERY_TTFT_SECONDS=metrics.Histogram("query_ttft_seconds","Time from /query request to first streamed text",("model",))
+QUERY_TOKENS_PER_SECOND=metrics.Histogram("query_tokens_per_second","Output tokens per second after the first token",
+                                          ("model",),buckets=(5,10,20,40,80,160,320,640))
+
+
+def sse_event(event:str,data)->bytes:
+    """One Server-Sent Event; ``data`` is JSON-encoded so newlines can't break the frame."""
+    return f"event: {event}\ndata: {codec.dumps_str(data)}\n\n".encode()
+
+
+def _signature(client:str)->str:
+    return hmac.new(QUERY_CLIENT_SECRET.encode(),client.encode(),hashlib.sha256).hexdigest()[:32]
+
+
+def issue_client_id()->str:
+    """A new client id, signed so that a caller can only present ids the server handed out."""
+    client=secrets.token_urlsafe(16)
+    return f"{client}.{_signature(client)}"
+
+
+def verify_client_id(token:Optional[str])->Optional[str]:
+    """The client behind a signed id from ``issue_client_id``, or None if it was not issued here."""
+    client,_,signature=(token or "").rpartition(".")
+    if client and hmac.compare_digest(signature,_signature(client)):
+        return client
+    return None
+
+
+class TooManyRequests(Exception):
+    """The client already has as many requests in flight as it is allowed."""
+
+
+class ClientLimiter:
+    """Caps how many requests each client may have in flight at once."""
+
+    def __init__(self,max_per_client:int=QUERY_MAX_PER_CLIENT):
+        self.max_per_client=max_per_client
+        self._active:dict[str,int]={}
+        self.rejected=0
+
+    @contextmanager
+    def hold(self,client:str):
+        """Raises ``TooManyRequests`` if ``client`` is already at its limit."""
+        active=self._active.get(client,0)
+        if active>=self.max_per_client:
+            self.rejected+=1
+            raise TooManyRequests(client)
+        self._active[client]=active+1
+        try:
+            yield
+        finally:
+            if self._active[client]==1:
+                del self._active[client]
+            else:
+                self._active[client]-=1
+
+    def stats(self)->dict:
+        return {"clients":len(self._active),"in_flight":sum(self._active.values()),"rejected":self.rejected}
+
+
+class StreamMeter:
+    """Time-to-first-token and output rate of one streamed answer."""
+
+    def __init__(self):
+        self.start=time.perf_counter()
+        self.first_token:Optional[float]=None
+        self.end:Optional[float]=None
+        self.deltas=0
+
+    def delta(self):
+        if self.first_token is None:
+            self.first_token=time.perf_counter()
+        self.deltas+=1
+
+    def finish(self,model:str,output_tokens:Optional[int]=None)->dict:
+        self.end=time.perf_counter()
+        report={"total_ms":(self.end-self.start)*1000}
+        if self.first_token is not None:
+            ttft=self.first_token-self.start
+            generating=self.end-self.first_token
+            # Without usage (e.g. cached answers) each streamed delta counts as one token.
+            tokens=output_tokens or self.deltas
+            report["ttft_ms"]=ttft*1000
+            report["output_tokens"]=tokens
+            QUERY_TTFT_SECONDS.observe(ttft,model=model)
+            if generating>0 and self.deltas>1:
+                report["tokens_per_sec"]=tokens/generating
+                QUERY_TOKENS_PER_SECOND.observe(report["tokens_per_sec"],model=model)
+        return report
@@ -0,0 +1,87 @@
+"""SlackClient against a local Slack webhook stub (no network access needed)."""
+import asyncio
+import time
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from slack_client import SlackClient
+
+
+class ScriptedSlack:
+    """Local Slack webhook answering with the scripted (status, headers) responses, then 200."""
+
+    def __init__(self,*responses:tuple[int,dict]):
+        self.responses=list(responses)
+        self.payloads:list[dict]=[]
+        self.arrivals:list[float]=[]
+        self.peers:list[tuple]=[]
+
+    async def handle(self,request):
+        self.payloads.append(await request.json())
+        self.arrivals.append(time.monotonic())
+        self.peers.append(request.transport.get_extra_info("peername"))
+        status,headers=self.responses.pop(0) if self.responses else (200,{})
+        return web.Response(status=status,headers=headers,text="ok" if status==200 else "nope")
+
+
+def run(stub:ScriptedSlack,scenario):
+    """Serve ``stub`` and run ``scenario(client)`` against it; returns the scenario's result and the client."""
+    async def main():
+        app=web.Application()
+        app.router.add_post("/hook",stub.handle)
+        server=TestServer(app)
+        await server.start_server()
+        client=SlackClient(str(server.make_url("/hook")),max_retries=2,backoff_base=0.01)
+        try:
+            return await scenario(client),client
+        finally:
+            await client.close()
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_rate_limited_post_waits_for_retry_after():
+    stub=ScriptedSlack((429,{"Retry-After":"1"}))
+    status,client=run(stub,lambda client: client.post({"text":"hi"}))
+    assert status.startswith("✅")
+    assert len(stub.payloads)==2
+    assert stub.arrivals[1]-stub.arrivals[0]>=1.0
+    assert client.rate_limited==1 and client.retries==1
+    assert client.stats()["status_codes"]=={429:1,200:1}
+
+
+def test_server_errors_are_retried_until_they_succeed():
+    stub=ScriptedSlack((500,{}),(503,{}))
+    status,client=run(stub,lambda client: client.post({"text":"hi"}))
+    assert status.startswith("✅")
+    assert len(stub.payloads)==3 and client.retries==2
+
+
+def test_gives_up_after_max_retries():
+    stub=ScriptedSlack(*[(503,{})]*5)
+    status,client=run(stub,lambda client: client.post({"text":"hi"}))
+    assert "Status: 503" in status
+    assert len(stub.payloads)==3 and client.errors==3
+
+
+def test_client_errors_are_not_retried():
+    stub=ScriptedSlack((400,{}))
+    status,client=run(stub,lambda client: client.post({"text":"hi"}))
+    assert "Status: 400" in status
+    assert len(stub.payloads)==1 and client.retries==0
+
+
+def test_posts_reuse_one_pooled_connection():
+    stub=ScriptedSlack()
+
+    async def scenario(client):
+        for i in range(5):
+            await client.post({"text":str(i)},channel="general")
+
+    run(stub,scenario)
+    assert [p["text"] for p in stub.payloads]==["0","1","2","3","4"]
+    assert len(set(stub.peers))==1
+
+
+def test_missing_webhook_url(monkeypatch):
+    monkeypatch.delenv("SLACK_WEBHOOK_URL",raising=False)
+    assert asyncio.run(SlackClient().post({"text":"hi"})).startswith("Error")
@@ -0,0 +1,275 @@
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional
+from agents import TracingProcessor
+from agents.tracing import Span, Trace, set_trace_processors
+import metrics
+
+# "weave" exports sampled traces to Weights & Biases, "none" only keeps the /metrics processor.
+TRACING_BACKEND=os.environ.get("TRACING_BACKEND","weave").lower()
+WEAVE_PROJECT=os.environ.get("WEAVE_PROJECT","openai-agents")
+TRACE_SAMPLE_RATE=float(os.environ.get("TRACE_SAMPLE_RATE","1.0"))
+TRACE_BATCH_SIZE=int(os.environ.get("TRACE_BATCH_SIZE","32"))
+TRACE_FLUSH_INTERVAL=float(os.environ.get("TRACE_FLUSH_INTERVAL","2"))
+TRACE_MAX_QUEUE=int(os.environ.get("TRACE_MAX_QUEUE","1000"))
+
+
+class MetricsTracingProcessor(TracingProcessor):
+    """Turns agents SDK spans into latency histograms and token counters.
+
+    Agent, guardrail and function-tool spans feed the matching histograms;
+    model response spans add their usage to ``model_tokens_total`` under the
+    agent that made the call.
+    """
+
+    def __init__(self):
+        self._started:dict[str,float]={}
+        self._agents:dict[str,str]={}
+
+    def on_trace_start(self,trace:Trace)->None:
+        pass
+
+    def on_trace_end(self,trace:Trace)->None:
+        pass
+
+    def on_span_start(self,span:Span)->None:
+        self._started[span.span_id]=time.perf_counter()
+        if span.span_data.type=="agent":
+            self._agents[span.span_id]=span.span_data.name
+
+    def on_span_end(self,span:Span)->None:
+        start=self._started.pop(span.span_id,None)
+        elapsed=time.perf_counter()-start if start is not None else 0.0
+        data=span.span_data
+        if data.type=="agent":
+            self._agents.pop(span.span_id,None)
+            metrics.AGENT_RUN_SECONDS.observe(elapsed,agent=data.name)
+        elif data.type=="guardrail":
+            metrics.GUARDRAIL_SECONDS.observe(elapsed,guardrail=data.name,triggered=str(bool(data.triggered)).lower())
+        elif data.type=="function":
+            metrics.TOOL_CALL_SECONDS.observe(elapsed,tool=data.name)
+        elif data.type=="response":
+            self._record_usage(span,getattr(data.response,"model",None),getattr(data.response,"usage",None))
+        elif data.type=="generation":
+            self._record_usage(span,data.model,data.usage)
+
+    def _record_usage(self,span:Span,model,usage):
+        if usage is None:
+            return
+        agent=self._agents.get(span.parent_id,"unknown")
+        for direction in ("input","output"):
+            tokens=usage.get(f"{direction}_tokens") if isinstance(usage,dict) else getattr(usage,f"{direction}_tokens",None)
+            if tokens:
+                metrics.MODEL_TOKENS.inc(tokens,agent=agent,model=model or "unknown",direction=direction)
+
+    def shutdown(self)->None:
+        pass
+
+    def force_flush(self)->None:
+        pass
+
+
+def _timestamp(value:Optional[str])->Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class SampledBatchProcessor(TracingProcessor):
+    """Head-sampled view of the traces for ``delegate``, plus every trace that fails.
+
+    Whether a trace is sampled is decided when it starts (``sample_rate``).
+    Sampled traces are forwarded to ``delegate`` as they happen, so it sees
+    real start and end times and the caller's context (Weave parents its
+    own OpenAI call records to the span that is running, and does its
+    network export on its own background executor).
+
+    Of the other traces only the finished spans are kept. If one of them
+    failed or tripped a guardrail, the trace is queued and handed to
+    ``export_finished(trace, spans)`` from a background thread, a batch
+    at a time. That exporter works from the spans' recorded timestamps,
+    so agent runs never wait on it.
+    """
+
+    def __init__(self,delegate:TracingProcessor,export_finished:Optional[Callable[[Trace,list[Span]],None]]=None,
+                 sample_rate:float=TRACE_SAMPLE_RATE,batch_size:int=TRACE_BATCH_SIZE,
+                 flush_interval:float=TRACE_FLUSH_INTERVAL,max_queue:int=TRACE_MAX_QUEUE):
+        self.delegate=delegate
+        self.export_finished=export_finished
+        self.sample_rate=sample_rate
+        self.batch_size=batch_size
+        self.flush_interval=flush_interval
+        self._sampled:set[str]=set()
+        self._unsampled:dict[str,list[Span]]={}
+        self._errored:set[str]=set()
+        self._lock=threading.Lock()
+        self._export_lock=threading.Lock()
+        self._queue:queue.Queue=queue.Queue(maxsize=max_queue)
+        self._stopped=threading.Event()
+        self._thread=threading.Thread(target=self._run,name="trace-exporter",daemon=True)
+        self._thread.start()
+        self.traces=0
+        self.sampled=0
+        self.kept_on_error=0
+        self.exported=0
+        self.overflowed=0
+
+    def on_trace_start(self,trace:Trace)->None:
+        with self._lock:
+            self.traces+=1
+            sampled=random.random()<self.sample_rate
+            if sampled:
+                self.sampled+=1
+                self._sampled.add(trace.trace_id)
+            else:
+                self._unsampled[trace.trace_id]=[]
+        if sampled:
+            self.delegate.on_trace_start(trace)
+
+    def on_span_start(self,span:Span)->None:
+        if span.trace_id in self._sampled:
+            self.delegate.on_span_start(span)
+
+    def on_span_end(self,span:Span)->None:
+        if span.trace_id in self._sampled:
+            self.delegate.on_span_end(span)
+            return
+        with self._lock:
+            spans=self._unsampled.get(span.trace_id)
+            if spans is None:
+                return
+            spans.append(span)
+            if span.error is not None or getattr(span.span_data,"triggered",False):
+                self._errored.add(span.trace_id)
+
+    def on_trace_end(self,trace:Trace)->None:
+        with self._lock:
+            if trace.trace_id in self._sampled:
+                self._sampled.discard(trace.trace_id)
+                sampled=True
+            else:
+                sampled=False
+                spans=self._unsampled.pop(trace.trace_id,None)
+                errored=trace.trace_id in self._errored
+                self._errored.discard(trace.trace_id)
+        if sampled:
+            self.delegate.on_trace_end(trace)
+            return
+        if spans is None or not errored or self.export_finished is None:
+            return
+        self.kept_on_error+=1
+        try:
+            self._queue.put_nowait((trace,spans))
+        except queue.Full:
+            self.overflowed+=1
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                batch=[self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch)<self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._export(batch)
+
+    def _export(self,batch:list[tuple[Trace,list[Span]]]):
+        with self._export_lock:
+            for trace,spans in batch:
+                try:
+                    self.export_finished(trace,spans)
+                    self.exported+=1
+                except Exception as e:
+                    print(f"⚠️ Trace export failed for {trace.trace_id}: {e}")
+
+    def _drain(self):
+        batch=[]
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._export(batch)
+
+    def force_flush(self)->None:
+        self._drain()
+        self.delegate.force_flush()
+
+    def shutdown(self)->None:
+        self._stopped.set()
+        self._thread.join(timeout=self.flush_interval+1)
+        self._drain()
+        self.delegate.shutdown()
+
+    def stats(self)->dict:
+        return {
+            "traces":self.traces,
+            "sampled":self.sampled,
+            "kept_on_error":self.kept_on_error,
+            "exported":self.exported,
+            "overflowed":self.overflowed,
+            "queue_depth":self._queue.qsize(),
+        }
+
+
+def export_to_weave(trace:Trace,spans:list[Span])->None:
+    """Log a finished trace to Weave with each span's recorded start and end time.
+
+    Off the call stack (``use_stack=False``), since the run it belongs to
+    is long over by the time this runs.
+    """
+    from weave.trace.context.weave_client_context import get_weave_client
+    wc=get_weave_client()
+    if wc is None or not spans:
+        return
+    spans=sorted(spans,key=lambda span: span.started_at or "")
+    root=wc.create_call(op="openai_agent_trace",inputs={"name":trace.name},parent=None,use_stack=False,
+                        attributes={"type":"task","agent_trace_id":trace.trace_id,"sampled":False},
+                        display_name=trace.name,started_at=_timestamp(spans[0].started_at))
+    calls={}
+    for span in spans:
+        data=span.span_data
+        name=getattr(data,"name",None) or data.type
+        calls[span.span_id]=wc.create_call(
+            op=f"openai_agent_{data.type}",inputs={"name":name},parent=calls.get(span.parent_id,root),use_stack=False,
+            attributes={"type":data.type,"agent_span_id":span.span_id,"agent_trace_id":trace.trace_id,
+                        "parent_span_id":span.parent_id},
+            display_name=name,started_at=_timestamp(span.started_at))
+    for span in reversed(spans):
+        wc.finish_call(calls[span.span_id],output={"output":span.span_data.export(),"error":span.error},
+                       ended_at=_timestamp(span.ended_at))
+    wc.finish_call(root,output={"status":"error"},ended_at=max(_timestamp(s.ended_at) or _timestamp(s.started_at)
+                                                              for s in spans))
+
+
+_processors:Optional[list[TracingProcessor]]=None
+
+
+def init_tracing(backend:str=TRACING_BACKEND,sample_rate:float=TRACE_SAMPLE_RATE)->list[TracingProcessor]:
+    """Install the trace processors once, at startup rather than at import.
+
+    weave is only imported here: importing and initializing it costs
+    seconds, which every import of main_agent used to pay.
+    """
+    global _processors
+    if _processors is not None:
+        return _processors
+    processors:list[TracingProcessor]=[MetricsTracingProcessor()]
+    if backend=="weave":
+        import weave
+        from weave.integrations.openai_agents.openai_agents import WeaveTracingProcessor
+        weave.init(WEAVE_PROJECT)
+        exporter=SampledBatchProcessor(WeaveTracingProcessor(),export_finished=export_to_weave,sample_rate=sample_rate)
+        metrics.register_stats("tracing",exporter.stats)
+        processors.append(exporter)
+    elif backend!="none":
+        raise ValueError(f"unknown TRACING_BACKEND {backend!r}, expected weave or none")
+    set_trace_processors(processors)
+    _processors=processors
+    return processors